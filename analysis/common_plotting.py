@@ -125,10 +125,15 @@ if __name__ == "__main__":
     # --------------------------------      
 
 
-    # Example usage
-    statepoint_path = os.path.join(project_root, 'data', 'run_full_source_flat', "statepoint.10.h5")
-    # statepoint_path = os.path.join(project_root, 'data', 'run_full_source_nonlinear', "statepoint.10.h5")
-    # statepoint_path = os.path.join(project_root, 'data', 'run_individual_sources_flat', "source_0001","statepoint.10.h5")
+    from src.flux_decomp.processing import find_final_statepoint
+
+    # Example usage: the run's final statepoint, whatever its batch count
+    run_dir = os.path.join(project_root, 'data', 'run_full_source_flat')
+    # run_dir = os.path.join(project_root, 'data', 'run_full_source_nonlinear')
+    # run_dir = os.path.join(project_root, 'data', 'run_individual_sources_flat', "source_0001")
+    statepoint_path = find_final_statepoint(run_dir)
+    if statepoint_path is None:
+        sys.exit(f"No statepoint found in {run_dir}")
 
     plots = plot_phir_slice_from_statepoint(statepoint_path)
     for i, plot in enumerate(plots):
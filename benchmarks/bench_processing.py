@@ -0,0 +1,172 @@
+# benchmarks/bench_processing.py
+# Benchmarks the analysis path (statepoint ingestion, matrix assembly, saving and
+# decomposition) on synthetic statepoints with cyl_tally's filter layout.
+# No OpenMC transport or cross sections are needed.
+#
+#   python benchmarks/bench_processing.py --sources 10,100 --meshes 40x95x3,80x190x6
+
+import argparse
+import json
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import os
+
+import numpy as np
+
+# --- Add project root to path ---
+# Prepended: processing.py resolves data directories relative to sys.path[0]
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+# --------------------------------
+
+from src.flux_decomp.flux_store import save_flux_store
+from src.flux_decomp.processing import (
+    create_individual_source_matrices,
+    load_tally_data,
+    load_tally_mean_std,
+    save_individual_source_matrices_as_npz
+)
+from src.flux_decomp.synthetic import write_synthetic_sweep
+
+def _max_rss_mb():
+    """Process high-water mark of the resident set size (MB, never decreases)."""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kB on Linux, bytes on macOS
+    return max_rss / 1024**2 if sys.platform == 'darwin' else max_rss / 1024
+
+def measure(name, func, n_items, n_bytes=None, repeat=1):
+    """
+    Runs func repeat times and returns its best wall time, throughput and the peak
+    Python/NumPy memory traced during one call.
+    """
+    times = []
+    peak = 0
+    for _ in range(repeat):
+        tracemalloc.start()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    best = min(times)
+    result = {
+        'stage': name,
+        'seconds': best,
+        'items_per_s': n_items / best if best > 0 else float('inf'),
+        'peak_traced_mb': peak / 1024**2,
+        'max_rss_mb': _max_rss_mb(),
+    }
+    if n_bytes is not None:
+        result['mb_per_s'] = n_bytes / 1024**2 / best if best > 0 else float('inf')
+    return result
+
+def _load_tally_data_once(statepoint_path):
+    """
+    load_tally_data goes through openmc.StatePoint, which needs a complete OpenMC
+    statepoint; the synthetic files only carry the tally data, so this stage may be skipped.
+    """
+    load_tally_data(statepoint_path, 'cyl_tally', 'mean')
+
+def run_case(work_dir, n_sources, mesh_dimension, workers, repeat):
+    """
+    Benchmarks every stage of the analysis path for one source count and mesh size.
+    """
+    sweep_dir = os.path.join(work_dir, 'sweep')
+    out_dir = os.path.join(work_dir, 'out')
+    paths = write_synthetic_sweep(sweep_dir, n_sources, mesh_dimension)
+    sweep_bytes = sum(os.path.getsize(p) for p in paths)
+    n_voxels = int(np.prod(mesh_dimension))
+
+    results = []
+    results.append(measure('ingest (h5py, per file)', lambda: [load_tally_mean_std(p, 'cyl_tally') for p in paths],
+                           n_sources, sweep_bytes, repeat))
+    try:
+        results.append(measure('ingest (load_tally_data)', lambda: _load_tally_data_once(paths[0]),
+                               1, os.path.getsize(paths[0]), repeat))
+    except Exception as e:
+        results.append({'stage': 'ingest (load_tally_data)', 'skipped': f"{type(e).__name__}: {e}"})
+
+    results.append(measure('assemble (serial)', lambda: create_individual_source_matrices(sweep_dir),
+                           n_sources, sweep_bytes, repeat))
+    if workers > 1:
+        results.append(measure(f'assemble ({workers} threads)',
+                               lambda: create_individual_source_matrices(sweep_dir, workers=workers),
+                               n_sources, sweep_bytes, repeat))
+    results.append(measure('assemble (memmap)',
+                           lambda: create_individual_source_matrices(sweep_dir, out_dir=os.path.join(out_dir, 'npy')),
+                           n_sources, sweep_bytes, repeat))
+
+    matrices = create_individual_source_matrices(sweep_dir)
+    matrix_bytes = 4 * matrices['thermal_mean'].nbytes
+    results.append(measure('save (npz)', lambda: save_individual_source_matrices_as_npz(
+        matrices['thermal_mean'], matrices['fast_mean'], matrices['thermal_stdev'], matrices['fast_stdev'],
+        file_path=os.path.join(out_dir, 'npz')), n_sources, matrix_bytes, repeat))
+
+    mesh = _SyntheticMesh(mesh_dimension)
+    full = np.zeros((2, n_voxels))
+    results.append(measure('save (HDF5 store)', lambda: save_flux_store(
+        os.path.join(out_dir, 'flux_data.h5'), mesh, full, full, matrices), n_sources, matrix_bytes, repeat))
+
+    results.append(measure('decompose (SVD, thermal mean)',
+                           lambda: np.linalg.svd(matrices['thermal_mean'], full_matrices=False),
+                           n_sources, matrices['thermal_mean'].nbytes, repeat))
+    return results
+
+class _SyntheticMesh:
+    """Stand-in for the cylindrical mesh attributes save_flux_store reads."""
+
+    def __init__(self, mesh_dimension):
+        nr, nphi, nz = mesh_dimension
+        self.dimension = mesh_dimension
+        self.r_grid = np.linspace(0, 129.8, nr + 1)
+        self.phi_grid = np.linspace(0, 2*np.pi, nphi + 1)
+        self.z_grid = np.linspace(-10, 10, nz + 1)
+        self.volumes = np.ones(mesh_dimension)
+
+def print_results(n_sources, mesh_dimension, results):
+    print(f"\n--- {n_sources} sources, mesh {'x'.join(str(n) for n in mesh_dimension)} ---")
+    print(f"{'stage':<32}{'time (s)':>10}{'items/s':>12}{'MB/s':>10}{'peak (MB)':>11}{'maxrss (MB)':>13}")
+    for r in results:
+        if 'skipped' in r:
+            print(f"{r['stage']:<32}  skipped ({r['skipped']})")
+            continue
+        mb_per_s = f"{r['mb_per_s']:.1f}" if 'mb_per_s' in r else '-'
+        print(f"{r['stage']:<32}{r['seconds']:>10.3f}{r['items_per_s']:>12.1f}{mb_per_s:>10}"
+              f"{r['peak_traced_mb']:>11.1f}{r['max_rss_mb']:>13.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the flux processing path on synthetic statepoints.")
+    parser.add_argument('--sources', default='10,100', help="Comma-separated source counts.")
+    parser.add_argument('--meshes', default='40x95x3', help="Comma-separated NRxNPHIxNZ mesh sizes.")
+    parser.add_argument('--workers', type=int, default=4, help="Threads for the parallel assembly stage.")
+    parser.add_argument('--repeat', type=int, default=3, help="Repetitions per stage (best time is reported).")
+    parser.add_argument('--work-dir', default=None, help="Directory for the synthetic files (default: a temp dir).")
+    parser.add_argument('--json', default=None, help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    source_counts = [int(n) for n in args.sources.split(',')]
+    meshes = [tuple(int(n) for n in m.split('x')) for m in args.meshes.split(',')]
+
+    all_results = []
+    for mesh_dimension in meshes:
+        for n_sources in source_counts:
+            work_dir = args.work_dir or tempfile.mkdtemp(prefix='flux_bench_')
+            case_dir = os.path.join(work_dir, f"{n_sources}_{'x'.join(str(n) for n in mesh_dimension)}")
+            try:
+                results = run_case(case_dir, n_sources, mesh_dimension, args.workers, args.repeat)
+            finally:
+                shutil.rmtree(case_dir, ignore_errors=True)
+                if args.work_dir is None:
+                    shutil.rmtree(work_dir, ignore_errors=True)
+            print_results(n_sources, mesh_dimension, results)
+            all_results.append({'n_sources': n_sources, 'mesh_dimension': mesh_dimension, 'results': results})
+
+    if args.json is not None:
+        with open(args.json, 'w') as f:
+            json.dump(all_results, f, indent=2)
+        print(f"\nResults written to {args.json}")
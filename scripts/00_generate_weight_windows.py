@@ -0,0 +1,39 @@
+# scripts/00_generate_weight_windows.py
+
+import argparse
+import shutil
+import sys
+import os
+
+# Set OPENMC_CROSS_SECTIONS #
+#os.environ["OPENMC_CROSS_SECTIONS"] = "/path/to/cross_sections.xml"
+#
+
+# --- Add project root to path ---
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(project_root)
+# --------------------------------
+
+from src.flux_decomp.inputs import get_flat_source_components
+from src.flux_decomp.model_cache import get_cached_model
+from src.flux_decomp.weight_windows import WEIGHT_WINDOWS_FILE, generate_weight_windows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate shared weight windows from a full-source pilot run.")
+    parser.add_argument('--batches', type=int, default=20, help="Pilot batches.")
+    parser.add_argument('--particles', type=int, default=100000, help="Pilot particles per batch.")
+    parser.add_argument('--threads', type=int, default=None, help="OpenMP threads for the pilot run.")
+    args = parser.parse_args()
+
+    print("--- Generating Shared Weight Windows ---")
+    geometry, materials_collection = get_cached_model()
+
+    run_dir = os.path.join(project_root, 'data', 'weight_window_pilot')
+    ww_file = generate_weight_windows(geometry, materials_collection, get_flat_source_components(),
+                                      run_dir, batches=args.batches, particles=args.particles,
+                                      threads=args.threads)
+
+    # Shared location every full-source and individual-source run points to
+    shared_file = os.path.join(project_root, 'data', WEIGHT_WINDOWS_FILE)
+    shutil.copyfile(ww_file, shared_file)
+    print(f"Weight windows saved to {shared_file}")
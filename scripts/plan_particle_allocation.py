@@ -0,0 +1,76 @@
+# scripts/plan_particle_allocation.py
+
+import argparse
+import numpy as np
+import sys
+import os
+
+# --- Add project root to path ---
+# Prepended: processing.py resolves data directories relative to sys.path[0]
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+# --------------------------------
+
+from src.flux_decomp.allocation import plan_particle_allocation, write_particle_plan
+from src.flux_decomp.cli import SOURCE_PROFILES, get_run_dirs
+from src.flux_decomp.processing import create_individual_source_matrices
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Plan particles per source from a short pilot sweep.")
+    parser.add_argument('--profile', choices=sorted(SOURCE_PROFILES), default='flat',
+                        help="Source strength profile of the pilot and production sweeps.")
+    parser.add_argument('--pilot-root', default=os.path.join(project_root, 'data', 'pilot'),
+                        help="--output-root of the pilot `flux-decomp run`.")
+    parser.add_argument('--pilot-dir', default=None,
+                        help="Pilot sweep directory (default: the profile's sweep under --pilot-root).")
+    parser.add_argument('--pilot-histories', type=float, required=True,
+                        help="Histories run per source in the pilot (batches x particles).")
+    parser.add_argument('--write-pilot-plan', default=None, metavar='PATH',
+                        help="Only write a uniform plan of --pilot-histories per source over --batches "
+                             "for the pilot sweep (pass it to `flux-decomp run --particle-plan`).")
+    parser.add_argument('--total-histories', type=float, default=None,
+                        help="History budget for the whole production sweep.")
+    parser.add_argument('--batches', type=int, default=100, help="Batches per production (or pilot) run.")
+    parser.add_argument('--objective', choices=['total', 'modes'], default='total',
+                        help="Minimize the variance of M @ strengths ('total') or of the leading POD modes ('modes').")
+    parser.add_argument('--n-modes', type=int, default=2, help="POD modes used by the 'modes' objective.")
+    parser.add_argument('--min-particles', type=int, default=1000, help="Minimum particles per batch for any source.")
+    parser.add_argument('--workers', type=int, default=1, help="Pilot statepoints read concurrently.")
+    parser.add_argument('--output', default=os.path.join(project_root, 'data', 'particle_plan.json'),
+                        help="Path of the JSON plan to write.")
+    args = parser.parse_args()
+
+    if args.write_pilot_plan is not None:
+        n_sources = len(SOURCE_PROFILES[args.profile]())
+        write_particle_plan(np.full(n_sources, args.pilot_histories), args.batches, args.write_pilot_plan)
+        sys.exit(0)
+    if args.total_histories is None:
+        parser.error("--total-histories is required to plan the production sweep.")
+
+    # The individual-source sweep that `flux-decomp run --output-root PILOT_ROOT` writes
+    pilot_dir = args.pilot_dir or get_run_dirs(os.path.abspath(args.pilot_root), args.profile)[1]
+
+    print("--- Planning Particle Allocation ---")
+    pilot = create_individual_source_matrices(base_dir=pilot_dir, tally_name='cyl_tally',
+                                              workers=args.workers)
+    if pilot['errors']:
+        # The plan needs one column per source, in source order
+        for run_dir, error in pilot['errors'].items():
+            print(f"Error reading {run_dir}: {error}")
+        sys.exit(1)
+
+    plan = plan_particle_allocation(
+        [pilot['thermal_mean'], pilot['fast_mean']],
+        [pilot['thermal_stdev'], pilot['fast_stdev']],
+        pilot_histories=args.pilot_histories,
+        total_histories=args.total_histories,
+        objective=args.objective,
+        n_modes=args.n_modes,
+        min_histories=args.min_particles * args.batches
+    )
+    print(f"Predicted variance objective: {plan['objective']:.4e} "
+          f"(uniform allocation: {plan['uniform_objective']:.4e}, "
+          f"{plan['uniform_objective'] / plan['objective']:.2f}x reduction)")
+
+    write_particle_plan(plan['histories'], args.batches, args.output, min_particles=args.min_particles)
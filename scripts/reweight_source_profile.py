@@ -0,0 +1,61 @@
+# scripts/reweight_source_profile.py
+
+import argparse
+import sys
+import os
+
+import numpy as np
+
+# --- Add project root to path ---
+# Prepended: processing.py resolves data directories relative to sys.path[0]
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+# --------------------------------
+
+from src.flux_decomp.cli import SOURCE_PROFILES, get_run_dirs
+from src.flux_decomp.processing import create_individual_source_matrices, find_final_statepoint, load_tally_data
+from src.flux_decomp.reweighting import compare_with_full_run, get_source_strengths, reweight_source_flux
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Derive a source profile's flux from the flat individual-source sweep, without its own sweep.")
+    parser.add_argument('--profile', choices=sorted(SOURCE_PROFILES), default='nonlinear',
+                        help="Source strength profile to derive.")
+    parser.add_argument('--sweep-dir', default='data/run_individual_sources_flat',
+                        help="Individual-source sweep to reweight, relative to the project root.")
+    parser.add_argument('--full-statepoint', default=None,
+                        help="Full-source statepoint of the profile to check against "
+                             "(default: the final statepoint of its full-source run, if any).")
+    parser.add_argument('--workers', type=int, default=1, help="Statepoints read concurrently.")
+    parser.add_argument('--output', default=None,
+                        help="Path of the .npz to write (default: data/analysis/reweighted_<profile>.npz).")
+    args = parser.parse_args()
+
+    print(f"--- Reweighting {args.sweep_dir} to the {args.profile} profile ---")
+    matrices = create_individual_source_matrices(base_dir=args.sweep_dir, tally_name='cyl_tally',
+                                                 workers=args.workers)
+    strengths = get_source_strengths(SOURCE_PROFILES[args.profile]())
+
+    results = {'strengths': strengths, 'source_indices': matrices['source_indices']}
+    for group in ('thermal', 'fast'):
+        results[f'{group}_mean'], results[f'{group}_stdev'] = reweight_source_flux(
+            matrices[f'{group}_mean'], matrices[f'{group}_stdev'], strengths, matrices['source_indices'])
+
+    full_statepoint = args.full_statepoint
+    if full_statepoint is None:
+        full_run_dir, _ = get_run_dirs(os.path.join(project_root, 'data'), args.profile)
+        full_statepoint = find_final_statepoint(full_run_dir) if os.path.isdir(full_run_dir) else None
+    if full_statepoint is not None:
+        full_mean = load_tally_data(full_statepoint, 'cyl_tally', 'mean')
+        full_stdev = load_tally_data(full_statepoint, 'cyl_tally', 'std_dev')
+        for e, group in enumerate(('thermal', 'fast')):
+            compare_with_full_run(results[f'{group}_mean'], results[f'{group}_stdev'],
+                                  full_mean[e].flatten(order='F'), full_stdev[e].flatten(order='F'),
+                                  label=group)
+    else:
+        print(f"No full-source run of the {args.profile} profile to check against.")
+
+    output = args.output or os.path.join(project_root, 'data', 'analysis', f'reweighted_{args.profile}.npz')
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    np.savez_compressed(output, **results)
+    print(f"Reweighted flux saved to {output}")
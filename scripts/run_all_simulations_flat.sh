@@ -4,10 +4,8 @@ set -e
 
 echo "Starting Simulation Workflow..."
 
-# 1. Full Source Run (e.g., Thermal Flux Reference)
-python scripts/01_run_full_source_flat.py
+# Full Source Run (Reference) and Individual Source Decomposition Runs,
+# scheduled together on one process pool. Extra options (e.g. --jobs 8) are passed through.
+python scripts/flux-decomp run --profile flat "$@"
 
-# 2. Individual Source Decomposition Runs
-python scripts/02_run_individual_sources_flat.py
-
-echo "--- All OpenMC Simulations Queued/Finished. ---"
\ No newline at end of file
+echo "--- All OpenMC Simulations Queued/Finished. ---"
@@ -4,10 +4,11 @@ set -e
 
 echo "Starting Simulation Workflow..."
 
-# 1. Full Source Run (e.g., Thermal Flux Reference)
-python scripts/01_run_full_source_nonlinear.py
-
-# 2. Individual Source Decomposition Runs
-python scripts/02_run_individual_sources_nonlinear.py
-
-echo "--- All OpenMC Simulations Queued/Finished. ---"
\ No newline at end of file
+# Full Source Run (Reference) only. The nonlinear profile differs from flat only in
+# source.strength, so its individual-source results are reweighted from the flat sweep
+# (run_all_simulations_flat.sh) instead of running a second sweep.
+# Extra options (e.g. --jobs 8) are passed through.
+python scripts/flux-decomp run --profile nonlinear --skip-individual "$@"
+python scripts/reweight_source_profile.py --profile nonlinear
+
+echo "--- All OpenMC Simulations Queued/Finished. ---"
@@ -0,0 +1,126 @@
+import numpy as np
+import json
+import os
+
+def _voxel_weights(mean_matrix, strengths, objective, n_modes):
+    """
+    Returns the per-voxel weight a_v of the allocation objective sum_v a_v * Var(F_v).
+      'total': a_v = 1 / F_v^2, i.e. the summed relative variance of F = M @ strengths.
+      'modes': a_v = sum_k u_kv^2 over the leading n_modes POD modes of M, i.e. the
+               variance of the total flux projected onto those modes.
+    """
+    if objective == 'total':
+        total_flux = mean_matrix @ strengths
+        weights = np.zeros_like(total_flux)
+        nonzero = total_flux != 0
+        weights[nonzero] = 1.0 / total_flux[nonzero] ** 2
+    elif objective == 'modes':
+        U, _, _ = np.linalg.svd(mean_matrix, full_matrices=False)
+        weights = np.sum(U[:, :n_modes] ** 2, axis=1)
+    else:
+        raise ValueError(f"Objective '{objective}' not recognized. Use 'total' or 'modes'.")
+    return weights
+
+def plan_particle_allocation(mean_matrices, stdev_matrices, pilot_histories, total_histories,
+                             strengths=None, objective='total', n_modes=2,
+                             cost_per_history=None, min_histories=0):
+    """
+    Allocates histories across source components to minimize the variance of the
+    reconstructed flux for a fixed compute budget, using a short pilot sweep.
+
+    With H_j histories, the pilot std-dev of column j scales as sigma_vj * sqrt(H0_j / H_j),
+    so Var(F_v) = sum_j w_j^2 sigma_vj^2 H0_j / H_j for F = M @ w. Minimizing
+    sum_v a_v Var(F_v) subject to sum_j c_j H_j = budget gives the Neyman allocation
+    H_j proportional to sqrt(A_j / c_j), with A_j = w_j^2 H0_j sum_v a_v sigma_vj^2.
+
+    Args:
+        mean_matrices (list): Pilot mean matrices (N_voxels x N_sources), e.g. [thermal, fast].
+        stdev_matrices (list): Matching pilot standard deviation matrices.
+        pilot_histories (float or np.ndarray): Histories run per source in the pilot
+            (batches x particles), scalar or one per source.
+        total_histories (float): History budget for the production sweep.
+        strengths (np.ndarray): Source strength vector w (defaults to ones).
+        objective (str): 'total' (relative variance of M @ w) or 'modes' (variance of
+            the leading POD modes).
+        n_modes (int): Number of POD modes used by the 'modes' objective.
+        cost_per_history (np.ndarray): Relative CPU cost of one history of each source
+            (defaults to equal cost).
+        min_histories (float): Minimum histories given to every source.
+
+    Returns:
+        dict: {'histories': np.ndarray (N_sources,), 'objective': float,
+               'uniform_objective': float} where the objectives are the predicted
+               sum_v a_v Var(F_v) for the planned and for a uniform allocation.
+    """
+    n_sources = mean_matrices[0].shape[1]
+    strengths = np.ones(n_sources) if strengths is None else np.asarray(strengths, dtype=float)
+    cost = np.ones(n_sources) if cost_per_history is None else np.asarray(cost_per_history, dtype=float)
+    pilot_histories = np.broadcast_to(np.asarray(pilot_histories, dtype=float), (n_sources,))
+
+    # --- Per-source variance coefficients A_j (summed over energy groups) ---
+    coefficients = np.zeros(n_sources)
+    for mean_matrix, stdev_matrix in zip(mean_matrices, stdev_matrices):
+        weights = _voxel_weights(mean_matrix, strengths, objective, n_modes)
+        coefficients += weights @ stdev_matrix ** 2
+    coefficients *= strengths ** 2 * pilot_histories
+
+    # --- Neyman allocation, holding sources below the floor at min_histories ---
+    at_floor = coefficients <= 0
+    while True:
+        budget = total_histories - np.sum(cost[at_floor]) * min_histories
+        free = ~at_floor
+        if budget <= 0 or not np.any(free):
+            histories = np.full(n_sources, float(min_histories))
+            break
+        histories = np.full(n_sources, float(min_histories))
+        root = np.sqrt(coefficients[free] * cost[free])
+        histories[free] = budget * np.sqrt(coefficients[free] / cost[free]) / np.sum(root)
+        below = free & (histories < min_histories)
+        if not np.any(below):
+            break
+        at_floor |= below
+
+    # Sources that do not contribute (A_j = 0) add no variance, even with zero histories
+    contributing = coefficients > 0
+    uniform = np.full(n_sources, total_histories / np.sum(cost))
+    return {
+        'histories': histories,
+        'objective': float(np.sum(coefficients[contributing] / histories[contributing])),
+        'uniform_objective': float(np.sum(coefficients[contributing] / uniform[contributing])),
+    }
+
+def write_particle_plan(histories, batches, plan_path, min_particles=1):
+    """
+    Converts planned histories to particles per batch and writes them as a JSON plan
+    that export_individual_source_runs can consume (see load_particle_plan).
+
+    Args:
+        histories (np.ndarray): Planned histories per source (in source order).
+        batches (int): Batches every production run will use.
+        plan_path (str): Path of the JSON plan to write.
+        min_particles (int): Minimum particles per batch for any source.
+    """
+    particles = np.maximum(np.rint(np.asarray(histories) / batches), min_particles).astype(int)
+    plan = {
+        'batches': int(batches),
+        'particles': particles.tolist(),
+    }
+    plan_dir = os.path.dirname(plan_path)
+    if plan_dir:
+        os.makedirs(plan_dir, exist_ok=True)
+    with open(plan_path, 'w') as f:
+        json.dump(plan, f, indent=2)
+
+    print(f"Particle plan for {len(particles)} sources saved to {plan_path}")
+
+def load_particle_plan(plan_path):
+    """
+    Loads a particle plan written by write_particle_plan.
+
+    Returns:
+        tuple: (batches, particles) where particles is a list of particles per batch
+        for each source, in source order.
+    """
+    with open(plan_path) as f:
+        plan = json.load(f)
+    return plan['batches'], plan['particles']
@@ -0,0 +1,309 @@
+import openmc
+import argparse
+import copy
+import os
+import sys
+import time
+
+# --- This block must run first to make 'models' and 'src' available ---
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+# ---------------------------------------------------------------------
+from src.flux_decomp.allocation import load_particle_plan
+from src.flux_decomp.incremental import update_incremental_svd
+from src.flux_decomp.inputs import (
+    apply_precision_trigger,
+    get_base_settings,
+    get_flat_source_components,
+    get_flux_tallies,
+    get_nonlinear_source_components
+)
+from src.flux_decomp.manifest import load_manifest
+from src.flux_decomp.model_cache import DEFAULT_CACHE_DIR, get_cached_model
+from src.flux_decomp.run_index import load_run_index
+from src.flux_decomp.runner import (
+    export_individual_source_runs,
+    export_one_pass_run,
+    get_manifest_path,
+    get_run_name,
+    run_sources_parallel
+)
+from src.flux_decomp.weight_windows import apply_weight_windows
+
+# Source profile name -> function returning its list of source components
+SOURCE_PROFILES = {
+    'flat': get_flat_source_components,
+    'nonlinear': get_nonlinear_source_components,
+}
+
+def parse_source_indices(spec, n_sources):
+    """
+    Parses a 1-based source selection such as "1-10,15,120-130" into sorted
+    0-based indices. None or "all" selects every source.
+    """
+    if spec is None or spec == 'all':
+        return list(range(n_sources))
+
+    indices = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, stop = (int(x) for x in part.split('-', 1))
+        else:
+            start = stop = int(part)
+        if start < 1 or stop > n_sources or start > stop:
+            raise ValueError(f"Source selection '{part}' is outside 1-{n_sources}.")
+        indices.update(range(start - 1, stop))
+    return sorted(indices)
+
+def get_run_dirs(output_root, profile):
+    """
+    Returns the (full source run directory, individual sources base directory) for a profile.
+    """
+    return (os.path.join(output_root, f'run_full_source_{profile}'),
+            os.path.join(output_root, f'run_individual_sources_{profile}'))
+
+def _print_plan(jobs):
+    """
+    Prints the planned jobs and their status in the sweep manifests (dry run).
+    Whether a completed run is still up to date is only decided when its inputs are exported.
+    """
+    manifests = {}
+    for stage, run_dir in jobs:
+        manifest_path = get_manifest_path(os.path.dirname(run_dir))
+        if manifest_path not in manifests:
+            manifests[manifest_path] = load_manifest(manifest_path)
+        entry = manifests[manifest_path].get(os.path.basename(run_dir))
+        status = entry['status'] if entry else 'new'
+        print(f"  [{stage:>10}] {os.path.basename(run_dir):<28} {status:<9} {run_dir}")
+    print(f"{len(jobs)} jobs planned (dry run, nothing exported or run).")
+
+def _build_settings(args):
+    """
+    Returns the settings template and per-source particles implied by the run options.
+    """
+    settings = get_base_settings()
+    particles = None
+    if args.particle_plan is not None:
+        settings.batches, particles = load_particle_plan(args.particle_plan)
+    if args.weight_windows is not None:
+        apply_weight_windows(settings, args.weight_windows)
+    return settings, particles
+
+def run_pipeline(args):
+    """
+    Plans and runs the full-source and individual-source simulations of one profile.
+    The full-source run and the individual runs share one process pool, with the
+    (longest) full-source run started first, so it no longer blocks the sweep.
+    """
+    output_root = os.path.abspath(args.output_root)
+    full_run_dir, base_run_dir = get_run_dirs(output_root, args.profile)
+
+    all_sources = SOURCE_PROFILES[args.profile]()
+    indices = parse_source_indices(args.sources, len(all_sources))
+    run_full = not args.skip_full
+    run_individual = not args.skip_individual
+
+    if args.mode == 'one-pass' and run_full:
+        print("One-pass mode: the tagged run also scores the full-source flux; skipping the separate full-source run.")
+        run_full = False
+
+    # --- Plan ---
+    jobs = []
+    if run_full:
+        jobs.append(('full', full_run_dir))
+    if run_individual:
+        if args.mode != 'one-pass':
+            jobs += [('individual', os.path.join(base_run_dir, get_run_name(i))) for i in indices]
+        else:
+            jobs.append((args.mode, os.path.join(base_run_dir, args.mode.replace('-', '_'))))
+
+    print(f"--- flux-decomp: profile '{args.profile}', mode '{args.mode}', "
+          f"{len(indices)} of {len(all_sources)} sources ---")
+    if args.dry_run:
+        _print_plan(jobs)
+        return 0
+    if not jobs:
+        print("Nothing to run.")
+        return 0
+
+    # --- Load model (built once per change to the model builders, then cached) ---
+    geometry, materials_collection = get_cached_model(args.model_cache, rebuild=args.rebuild_model)
+    settings, particles = _build_settings(args)
+
+    # --- Export ---
+    run_dirs = []
+    if run_full:
+        full_settings = copy.deepcopy(settings)
+        full_settings.source = all_sources
+        model = openmc.model.Model(
+            geometry=geometry,
+            materials=materials_collection,
+            settings=full_settings,
+            tallies=get_flux_tallies()
+        )
+        os.makedirs(full_run_dir, exist_ok=True)
+        model.export_to_xml(directory=full_run_dir)
+        run_dirs.append(full_run_dir)
+
+    selected_sources = [all_sources[i] for i in indices]
+    if run_individual and args.mode != 'one-pass':
+        tallies = get_flux_tallies()
+        individual_settings = copy.deepcopy(settings)
+        if args.target_rel_err is not None:
+            apply_precision_trigger(individual_settings, tallies, args.target_rel_err,
+                                    min_batches=args.min_batches, max_batches=args.max_batches,
+                                    roi=args.roi)
+        run_dirs += export_individual_source_runs(
+            geometry, materials_collection, tallies, all_sources, base_run_dir,
+            shared_dir=os.path.join(base_run_dir, 'shared_model'),
+            settings=individual_settings, particles=particles, indices=indices
+        )
+    elif run_individual and args.mode == 'one-pass':
+        run_dirs.append(export_one_pass_run(
+            geometry, materials_collection, selected_sources, jobs[-1][1],
+            settings=settings, particles_per_source=args.particles_per_source
+        ))
+
+    # --- Run ---
+    results = run_sources_parallel(run_dirs, jobs=args.jobs, total_threads=args.threads, resume=True,
+                                   in_process=args.mode == 'in-process')
+    print("\nAll simulations finished.")
+    return 1 if results['failed'] else 0
+
+def index_runs(args):
+    """
+    Builds (or refreshes) the run index of a profile's individual-source sweep and
+    lists the runs that are not complete.
+    """
+    _, base_run_dir = get_run_dirs(os.path.abspath(args.output_root), args.profile)
+    if not os.path.isdir(base_run_dir):
+        print(f"No sweep directory {base_run_dir}")
+        return 1
+
+    index = load_run_index(base_run_dir, refresh=args.refresh)
+    for name, entry in sorted(index['runs'].items(), key=lambda item: item[1]['source']):
+        if entry['status'] != 'complete':
+            print(f"  {name:<14} {entry['status']:<10} {entry['error'] or ''}")
+    print(f"{index['counts'].get('complete', 0)} of {len(index['runs'])} runs complete.")
+    return 0
+
+def track_svd(args):
+    """
+    Folds the runs of a profile's sweep that completed since the last call into its
+    incremental SVD. With --watch, repeats every WATCH seconds until the spectrum has
+    converged or no run is left to finish.
+    """
+    _, base_run_dir = get_run_dirs(os.path.abspath(args.output_root), args.profile)
+    if not os.path.isdir(base_run_dir):
+        print(f"No sweep directory {base_run_dir}")
+        return 1
+    state_dir = args.state_dir or os.path.join(base_run_dir, f'svd_{args.key}')
+
+    while True:
+        svd, converged = update_incremental_svd(base_run_dir, state_dir, args.key, args.rank,
+                                                workers=args.workers, tol=args.tol, window=args.window)
+        index = load_run_index(base_run_dir)
+        if converged:
+            print(f"Spectrum converged after {svd.n_sources} sources (tol {args.tol}).")
+            return 0
+        # Runs still to finish are missing (not started) or partial (running)
+        pending = index['counts'].get('missing', 0) + index['counts'].get('partial', 0)
+        if args.watch is None or pending == 0:
+            return 0
+        time.sleep(args.watch)
+
+def get_parser():
+    """
+    Returns the argument parser of the flux-decomp command.
+    """
+    parser = argparse.ArgumentParser(
+        prog='flux-decomp',
+        description="OpenMC flux decomposition workflow."
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run = subparsers.add_parser('run', help="Run the full-source and individual-source simulations.")
+    run.add_argument('--profile', choices=sorted(SOURCE_PROFILES), default='flat',
+                     help="Source strength profile.")
+    run.add_argument('--sources', default=None,
+                     help="1-based source selection, e.g. '1-10,15' (default: all).")
+    run.add_argument('--skip-full', action='store_true', help="Do not run the full-source simulation.")
+    run.add_argument('--skip-individual', action='store_true', help="Do not run the individual sources.")
+    run.add_argument('--mode', choices=['sweep', 'one-pass', 'in-process'], default='sweep',
+                     help="One OpenMC run per source (sweep), one tagged run for all sources (one-pass), "
+                          "or the sweep's runs through openmc.lib in the worker processes (in-process).")
+    run.add_argument('--jobs', type=int, default=1, help="Number of OpenMC runs to execute at once.")
+    run.add_argument('--threads', type=int, default=None,
+                     help="Total OpenMP threads to split across the concurrent runs (defaults to all cores).")
+    run.add_argument('--output-root', default=os.path.join(project_root, 'data'),
+                     help="Directory that holds the run_* output directories.")
+    run.add_argument('--dry-run', action='store_true', help="Only print the planned jobs.")
+    run.add_argument('--target-rel-err', type=float, default=None,
+                     help="Stop each individual run once the flux relative error is below this target (not with one-pass).")
+    run.add_argument('--min-batches', type=int, default=10, help="Batches run before the precision target is checked.")
+    run.add_argument('--max-batches', type=int, default=1000, help="Batch limit when using a precision target.")
+    run.add_argument('--roi', type=float, nargs=2, default=None, metavar=('R_MIN', 'R_MAX'),
+                     help="Only apply the precision target to r_min <= r <= r_max (cm).")
+    run.add_argument('--particle-plan', default=None,
+                     help="JSON plan of particles per source (not with one-pass; see scripts/plan_particle_allocation.py).")
+    run.add_argument('--particles-per-source', type=int, default=None,
+                     help="One-pass only: particles per batch per source component.")
+    run.add_argument('--weight-windows', default=None,
+                     help="Shared weight window file (see scripts/00_generate_weight_windows.py).")
+    run.add_argument('--model-cache', default=DEFAULT_CACHE_DIR,
+                     help="Directory of the built-model cache.")
+    run.add_argument('--rebuild-model', action='store_true',
+                     help="Rebuild the cached model even if the builders are unchanged.")
+    run.set_defaults(func=run_pipeline)
+
+    index = subparsers.add_parser('index', help="Index the final statepoints and status of a sweep.")
+    index.add_argument('--profile', choices=sorted(SOURCE_PROFILES), default='flat',
+                       help="Source strength profile.")
+    index.add_argument('--output-root', default=os.path.join(project_root, 'data'),
+                       help="Directory that holds the run_* output directories.")
+    index.add_argument('--refresh', action='store_true',
+                       help="Rescan the sweep instead of using the cached index.")
+    index.set_defaults(func=index_runs)
+
+    svd = subparsers.add_parser('svd', help="Fold completed runs into the incremental SVD of a sweep.")
+    svd.add_argument('--profile', choices=sorted(SOURCE_PROFILES), default='flat',
+                     help="Source strength profile.")
+    svd.add_argument('--output-root', default=os.path.join(project_root, 'data'),
+                     help="Directory that holds the run_* output directories.")
+    svd.add_argument('--key', default='thermal_mean',
+                     choices=['thermal_mean', 'thermal_stdev', 'fast_mean', 'fast_stdev'],
+                     help="Source matrix to decompose.")
+    svd.add_argument('--rank', type=int, default=10, help="Number of modes kept.")
+    svd.add_argument('--state-dir', default=None,
+                     help="Directory of the saved factors (default: svd_<key> in the sweep directory).")
+    svd.add_argument('--workers', type=int, default=1, help="Number of statepoints read at once.")
+    svd.add_argument('--tol', type=float, default=1e-3,
+                     help="Convergence tolerance on the spectrum and leading modes.")
+    svd.add_argument('--window', type=int, default=5,
+                     help="Consecutive updates that must stay within the tolerance.")
+    svd.add_argument('--watch', type=float, default=None, metavar='SECONDS',
+                     help="Keep folding in new runs every SECONDS until converged or the sweep is finished.")
+    svd.set_defaults(func=track_svd)
+
+    return parser
+
+def main(argv=None):
+    """
+    Entry point of the flux-decomp command.
+    """
+    parser = get_parser()
+    args = parser.parse_args(argv)
+    if args.command == 'run' and args.mode == 'one-pass':
+        # One tagged run cannot stop per source or give each source its own particle count
+        for option, value in (('--target-rel-err', args.target_rel_err), ('--roi', args.roi),
+                              ('--particle-plan', args.particle_plan)):
+            if value is not None:
+                parser.error(f"{option} does not apply to --mode one-pass.")
+    elif args.command == 'run' and args.particles_per_source is not None:
+        # Per-source runs take their particle counts from the settings or --particle-plan
+        parser.error(f"--particles-per-source only applies to --mode one-pass, not --mode {args.mode}.")
+    return args.func(args)
@@ -0,0 +1,295 @@
+import numpy as np
+
+# Truncated SVD solvers of the (N_spatial_voxels x N_sources) flux matrices
+SVD_METHODS = ('randomized', 'lanczos', 'full')
+
+def get_energy_rank(singular_values, total_energy, energy):
+    """
+    Returns the smallest rank whose modes capture at least the given fraction of the
+    matrix energy (squared Frobenius norm), or None if all given modes fall short.
+    """
+    captured = np.cumsum(singular_values**2) / total_energy
+    reached = np.flatnonzero(captured >= energy)
+    return int(reached[0]) + 1 if reached.size else None
+
+def truncation_error(total_energy, singular_values):
+    """
+    Returns the Frobenius norm of M - U_k S_k V_k^T, sqrt(||M||_F^2 - sum(s_k^2)),
+    computed from the kept singular values without forming the reconstruction.
+    """
+    return float(np.sqrt(max(total_energy - np.sum(singular_values**2), 0.0)))
+
+def _get_info(total_energy, s, method, error=None, **extra):
+    """
+    Returns the summary of a truncated decomposition. The error is computed from the
+    singular values unless given (it must be for factors that are not an SVD of M).
+    """
+    if error is None:
+        error = truncation_error(total_energy, s)
+    info = {
+        'method': method,
+        'rank': len(s),
+        'energy_captured': float(np.sum(s**2) / total_energy) if total_energy > 0 else 1.0,
+        'truncation_error': error,
+        'relative_error': float(error / np.sqrt(total_energy)) if total_energy > 0 else 0.0,
+    }
+    info.update(extra)
+    return info
+
+def _check_target(matrix, rank, energy):
+    if (rank is None) == (energy is None):
+        raise ValueError("Give either a target rank or an energy fraction.")
+    if rank is not None and not 1 <= rank <= min(matrix.shape):
+        raise ValueError(f"rank must be between 1 and {min(matrix.shape)}, not {rank}.")
+    if energy is not None and not 0 < energy <= 1:
+        raise ValueError(f"energy must be in (0, 1], not {energy}.")
+
+def _range_finder(matrix, n_columns, n_power_iter, rng):
+    """
+    Returns an orthonormal basis Q (N_spatial_voxels x n_columns) approximating the
+    range of the matrix, with power iterations re-orthonormalized at every step.
+    """
+    q, _ = np.linalg.qr(matrix @ rng.standard_normal((matrix.shape[1], n_columns)))
+    for _ in range(n_power_iter):
+        w, _ = np.linalg.qr(matrix.T @ q)
+        q, _ = np.linalg.qr(matrix @ w)
+    return q
+
+def randomized_svd(matrix, rank=None, energy=None, oversample=10, n_power_iter=2, seed=0):
+    """
+    Computes the leading modes of a matrix with a randomized range finder.
+
+    With a target energy fraction, the sketch size starts at 2*oversample and doubles
+    until the sketched modes capture that fraction of ||M||_F^2 (or the sketch covers
+    the whole matrix); the rank is then the fewest modes reaching it.
+
+    Parameters:
+    -----------
+    matrix : np.ndarray
+        (N_spatial_voxels x N_sources) matrix.
+    rank : int
+        Number of modes to return.
+    energy : float
+        Fraction of the matrix energy the returned modes must capture (instead of rank).
+    oversample : int
+        Extra sketch columns beyond the rank.
+    n_power_iter : int
+        Power iterations; improves accuracy when the spectrum decays slowly.
+    seed : int
+        Seed of the Gaussian test matrix.
+
+    Returns:
+    --------
+    U, s, Vt : np.ndarray
+        Truncated factors (U is N_spatial_voxels x k, Vt is k x N_sources).
+    info : dict
+        'rank', 'energy_captured', 'truncation_error' (Frobenius norm of the residual)
+        and 'relative_error' (the same over ||M||_F).
+    """
+    _check_target(matrix, rank, energy)
+    rng = np.random.default_rng(seed)
+    total_energy = float(np.sum(np.square(matrix)))
+    max_columns = min(matrix.shape)
+
+    n_columns = min(rank + oversample, max_columns) if rank is not None else min(2 * oversample, max_columns)
+    while True:
+        q = _range_finder(matrix, n_columns, n_power_iter, rng)
+        u_small, s, vt = np.linalg.svd(q.T @ matrix, full_matrices=False)
+        if rank is not None:
+            k = rank
+            break
+        k = get_energy_rank(s, total_energy, energy) if total_energy > 0 else 1
+        if k is not None or n_columns == max_columns:
+            k = k or len(s)
+            break
+        n_columns = min(2 * n_columns, max_columns)
+
+    u = q @ u_small[:, :k]
+    return u, s[:k], vt[:k], _get_info(total_energy, s[:k], 'randomized', sketch_size=n_columns)
+
+def lanczos_svd(matrix, rank=None, energy=None, tol=0):
+    """
+    Computes the leading modes with the Lanczos-based scipy.sparse.linalg.svds solver
+    (accurate to tol, without a sketch). With an energy fraction, the number of modes
+    doubles until the fraction is reached. Same returns as randomized_svd.
+    """
+    from scipy.sparse.linalg import svds
+
+    _check_target(matrix, rank, energy)
+    total_energy = float(np.sum(np.square(matrix)))
+    # svds needs k < min(shape); fall back to the full SVD beyond that
+    max_k = min(matrix.shape) - 1
+
+    k = rank if rank is not None else min(10, max_k)
+    while True:
+        if k > max_k or max_k < 1:
+            u, s, vt = np.linalg.svd(matrix, full_matrices=False)
+        else:
+            u, s, vt = svds(matrix, k=k, tol=tol, random_state=0)
+            order = np.argsort(s)[::-1]
+            u, s, vt = u[:, order], s[order], vt[order]
+        if rank is not None:
+            keep = rank
+            break
+        keep = get_energy_rank(s, total_energy, energy) if total_energy > 0 else 1
+        if keep is not None or len(s) >= min(matrix.shape):
+            keep = keep or len(s)
+            break
+        k = 2 * k
+
+    return u[:, :keep], s[:keep], vt[:keep], _get_info(total_energy, s[:keep], 'lanczos')
+
+def truncated_svd(matrix, rank=None, energy=None, method='randomized', **kwargs):
+    """
+    Returns the leading modes (U, s, Vt, info) of a flux matrix, for a target rank or
+    energy fraction, with the 'randomized' (default), 'lanczos' or 'full' solver.
+    """
+    if method == 'randomized':
+        return randomized_svd(matrix, rank, energy, **kwargs)
+    if method == 'lanczos':
+        return lanczos_svd(matrix, rank, energy, **kwargs)
+    if method != 'full':
+        raise ValueError(f"Unknown SVD method '{method}'. Choose from {SVD_METHODS}.")
+
+    _check_target(matrix, rank, energy)
+    u, s, vt = np.linalg.svd(matrix, full_matrices=False)
+    total_energy = float(np.sum(s**2))
+    k = rank if rank is not None else (get_energy_rank(s, total_energy, energy) or len(s))
+    return u[:, :k], s[:k], vt[:k], _get_info(total_energy, s[:k], 'full')
+
+# --- Uncertainty-Weighted Decomposition ---
+# Weighted least squares: minimize sum_ij w_ij (M_ij - (A B^T)_ij)^2 with w_ij = 1/sigma_ij^2,
+# so noisy voxels count less than converged ones. The weights are kept as an elementwise
+# (N_spatial_voxels x N_sources) array, never as a diagonal matrix.
+
+def get_inverse_variance_weights(stdev, mean=None, rel_floor=1e-3):
+    """
+    Returns the weights 1/sigma^2 of a std-dev matrix.
+
+    Bins that never scored (zero mean and zero std-dev) carry no information and get a
+    zero weight. Other std-devs are floored at rel_floor times the median positive
+    std-dev, so a zero std-dev (e.g. one realization) cannot get an infinite weight.
+    """
+    stdev = np.asarray(stdev, dtype=float)
+    positive = stdev[stdev > 0]
+    if positive.size == 0:
+        raise ValueError("The std-dev matrix has no positive entries.")
+    floor = rel_floor * np.median(positive)
+    weights = 1.0 / np.maximum(stdev, floor)**2
+    if mean is not None:
+        weights[(stdev == 0) & (np.asarray(mean) == 0)] = 0.0
+    return weights
+
+def _residual_norm(matrix, u, s, vt):
+    return float(np.linalg.norm(matrix - (u * s) @ vt))
+
+def _weighted_objective(matrix, weights, a, b):
+    return float(np.sum(weights * (matrix - a @ b.T)**2))
+
+def _solve_rows(matrix, weights, factor, ridge):
+    """
+    Solves the weighted least-squares problem of every row of A at once:
+    (sum_j w_ij b_j b_j^T) a_i = sum_j w_ij m_ij b_j, as a batch of k x k systems.
+    """
+    k = factor.shape[1]
+    # Row i of weights @ outer products gives the k x k normal matrix of row i
+    outer = (factor[:, :, np.newaxis] * factor[:, np.newaxis, :]).reshape(-1, k * k)
+    normal = (weights @ outer).reshape(-1, k, k)
+    diagonal = normal[:, np.arange(k), np.arange(k)]
+    normal[:, np.arange(k), np.arange(k)] += ridge * np.mean(diagonal)
+    rhs = (weights * matrix) @ factor
+    return np.linalg.solve(normal, rhs[..., np.newaxis])[..., 0]
+
+def _orthonormal_factors(a, b):
+    """
+    Returns (U, s, Vt) with U s Vt = A B^T, from the QR factors of A and B.
+    """
+    q_a, r_a = np.linalg.qr(a)
+    q_b, r_b = np.linalg.qr(b)
+    u, s, vt = np.linalg.svd(r_a @ r_b.T)
+    return q_a @ u, s, vt @ q_b.T
+
+def whitened_svd(matrix, stdev, rank, rel_floor=1e-3, **kwargs):
+    """
+    Approximates the weighted decomposition with a single SVD. The std-dev matrix is
+    approximated by its leading mode (sigma_ij ~ r_i c_j, a voxel and a source scale).
+    The matrix is scaled to D_r^-1 M D_c^-1, which has roughly uniform noise, decomposed
+    with truncated_svd, and scaled back. It is exact when the std-devs separate like this.
+
+    Returns:
+        U, s, Vt (np.ndarray), info (dict): As truncated_svd.
+    """
+    u_sigma, _, vt_sigma, _ = truncated_svd(stdev, rank=1, **kwargs)
+    r = np.abs(u_sigma[:, 0])
+    c = np.abs(vt_sigma[0])
+    r = np.maximum(r, rel_floor * np.median(r[r > 0]))
+    c = np.maximum(c, rel_floor * np.median(c[c > 0]))
+
+    u, s, vt, info = truncated_svd(matrix / r[:, np.newaxis] / c, rank=rank, **kwargs)
+    u, s, vt = _orthonormal_factors(r[:, np.newaxis] * u * s, c[:, np.newaxis] * vt.T)
+    info = _get_info(float(np.sum(np.square(matrix))), s, 'whitened', _residual_norm(matrix, u, s, vt),
+                     whitened_relative_error=info['relative_error'])
+    return u, s, vt, info
+
+def weighted_low_rank(matrix, stdev, rank, max_iter=100, tol=1e-6, rel_floor=1e-3, ridge=1e-10):
+    """
+    Computes a rank-k decomposition of a source matrix weighted by its uncertainties,
+    with alternating weighted least squares (ALS).
+
+    Each sweep solves for A with B fixed, then for B with A fixed. Both steps are
+    batches of k x k normal equations, one per voxel or source. The solver starts
+    from the whitened SVD and stops once the weighted objective decreases by less
+    than tol (relative) between sweeps.
+
+    Parameters:
+    -----------
+    matrix : np.ndarray
+        (N_spatial_voxels x N_sources) mean flux matrix.
+    stdev : np.ndarray
+        Matching std-dev matrix; the weights are 1/stdev^2 (see get_inverse_variance_weights).
+    rank : int
+        Number of modes.
+    max_iter : int
+        Maximum number of ALS sweeps.
+    tol : float
+        Relative decrease of the weighted objective below which ALS has converged.
+    rel_floor : float
+        Std-dev floor, relative to the median positive std-dev.
+    ridge : float
+        Regularization of the normal equations, relative to their mean diagonal.
+
+    Returns:
+    --------
+    U, s, Vt : np.ndarray
+        Orthonormalized factors of the weighted rank-k fit.
+    info : dict
+        As truncated_svd, plus 'iterations', 'converged', 'objective' (weighted sum of
+        squared residuals per sweep) and 'reduced_chi2' (final objective per degree of
+        freedom; about 1 when the fit is limited by the statistical noise).
+    """
+    _check_target(matrix, rank, None)
+    weights = get_inverse_variance_weights(stdev, matrix, rel_floor)
+    u, s, vt, _ = whitened_svd(matrix, stdev, rank, rel_floor)
+    a = u * s
+    b = vt.T
+
+    objective = [_weighted_objective(matrix, weights, a, b)]
+    converged = False
+    for _ in range(max_iter):
+        a = _solve_rows(matrix, weights, b, ridge)
+        b = _solve_rows(matrix.T, weights.T, a, ridge)
+        objective.append(_weighted_objective(matrix, weights, a, b))
+        if objective[-2] - objective[-1] <= tol * objective[-2]:
+            converged = True
+            break
+    if not converged:
+        print(f"Warning: weighted ALS did not converge in {max_iter} iterations "
+              f"(last relative decrease {(objective[-2] - objective[-1]) / objective[-2]:.2e}).")
+
+    u, s, vt = _orthonormal_factors(a, b)
+    n_valid = int(np.count_nonzero(weights))
+    dof = max(n_valid - rank * (sum(matrix.shape) - rank), 1)
+    info = _get_info(float(np.sum(np.square(matrix))), s, 'weighted_als', _residual_norm(matrix, u, s, vt),
+                     iterations=len(objective) - 1, converged=converged, objective=objective,
+                     reduced_chi2=objective[-1] / dof)
+    return u, s, vt, info
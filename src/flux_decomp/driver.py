@@ -0,0 +1,59 @@
+import contextlib
+import os
+import sys
+
+@contextlib.contextmanager
+def _redirect_output(log_path):
+    """
+    Sends everything written to stdout (file descriptor 1) to log_path, including the
+    output of the OpenMC shared library, which bypasses sys.stdout.
+    """
+    sys.stdout.flush()
+    saved_fd = os.dup(1)
+    try:
+        with open(log_path, 'w') as log_file:
+            os.dup2(log_file.fileno(), 1)
+            try:
+                yield
+            finally:
+                sys.stdout.flush()
+                os.dup2(saved_fd, 1)
+    finally:
+        os.close(saved_fd)
+
+def run_source_in_process(run_dir, threads=None, log_path=None):
+    """
+    Runs the exported inputs of run_dir through openmc.lib inside the calling process,
+    instead of starting an `openmc` executable for it.
+
+    openmc.lib cannot replace settings.source after initialization, so every run is its
+    own init/run/finalize cycle on the run directory's XML inputs: the run uses exactly
+    the settings (source, batches, triggers) that were exported for it. A worker process
+    that runs many sources in turn keeps the library loaded and skips one process launch
+    and interpreter startup per source.
+
+    Args:
+        run_dir (str): Directory holding the run's XML inputs; the statepoint is written there.
+        threads (int): OpenMP threads for this run.
+        log_path (str): File receiving OpenMC's output (None leaves it on stdout).
+
+    Returns:
+        str: The run directory.
+    """
+    # Imported here: loading libopenmc is only needed by in-process runs
+    import openmc.lib
+
+    args = ['-s', str(threads)] if threads is not None else []
+    log_path = os.path.abspath(log_path) if log_path else None
+    previous_dir = os.getcwd()
+    os.chdir(run_dir)
+    try:
+        with _redirect_output(log_path) if log_path else contextlib.nullcontext():
+            openmc.lib.init(args=args, output=True)
+            try:
+                openmc.lib.run(output=True)
+            finally:
+                openmc.lib.finalize()
+    finally:
+        os.chdir(previous_dir)
+    return run_dir
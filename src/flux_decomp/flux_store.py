@@ -0,0 +1,192 @@
+import numpy as np
+import h5py
+import os
+
+from src.flux_decomp.precision import compare_precision, get_storage_dtype, print_precision_report, reduce_precision
+
+FLUX_STORE_FILE = 'flux_data.h5'
+
+# Energy groups of the flux tally, in energy filter order
+ENERGY_GROUPS = ('thermal', 'fast')
+
+# Source columns per chunk: a single column, a single voxel row or a single z-slice
+# then only touches a few chunks instead of the whole matrix
+DEFAULT_CHUNK_COLUMNS = 16
+
+def get_matrix_chunks(mesh_dimension, n_sources, chunk_columns=DEFAULT_CHUNK_COLUMNS):
+    """
+    Returns the chunk shape of a (N_spatial_voxels x N_sources) matrix: one z-slice of
+    voxels (nr*nphi rows, contiguous in mesh-bin order) by chunk_columns sources.
+    """
+    nr, nphi, _ = mesh_dimension
+    return (int(nr * nphi), int(max(1, min(chunk_columns, n_sources))))
+
+def _write_matrix(group, name, matrix, chunks, compression, compression_opts,
+                  precision='float64', max_rel_err=None):
+    """
+    Writes a matrix as a chunked, compressed dataset, one block of chunk columns at a
+    time so disk-backed (memmap) matrices are never loaded whole. With reduced precision,
+    returns the error against the original (see compare_precision), else None.
+    """
+    dataset = group.create_dataset(name, shape=matrix.shape, dtype=get_storage_dtype(precision, max_rel_err),
+                                   chunks=chunks, compression=compression,
+                                   compression_opts=compression_opts, shuffle=True)
+    dataset.attrs['precision'] = precision
+    if max_rel_err is not None:
+        dataset.attrs['max_rel_err'] = max_rel_err
+
+    stats = None
+    step = chunks[1]
+    for start in range(0, matrix.shape[1], step):
+        block = matrix[:, start:start + step]
+        if precision == 'float64':
+            dataset[:, start:start + step] = block
+        else:
+            reduced = reduce_precision(block, precision, max_rel_err)
+            stats = compare_precision(block, reduced, stats)
+            dataset[:, start:start + step] = reduced
+
+    if stats is not None:
+        dataset.attrs['achieved_max_rel_err'] = stats['max_rel_err']
+        dataset.attrs['achieved_rms_rel_err'] = stats['rms_rel_err']
+    return stats
+
+def save_flux_store(store_path, mesh, full_mean, full_stdev, matrices, source_metadata=None,
+                    chunk_columns=DEFAULT_CHUNK_COLUMNS, compression='gzip', compression_opts=4,
+                    precision='float64', max_rel_err=None):
+    """
+    Saves the whole decomposition dataset to one chunked, compressed HDF5 file.
+
+    Layout:
+        /mesh                          r_grid, phi_grid, z_grid, volumes (attr: dimension)
+        /full_source/{group}/mean      (N_spatial_voxels,) full-source flux
+        /full_source/{group}/stdev
+        /sources/{group}/mean          (N_spatial_voxels x N_sources) individual source matrix
+        /sources/{group}/stdev
+    /sources carries the source metadata as attributes (at least source_indices).
+    Voxels are in mesh-bin order (the .flatten(order='F') order of load_tally_data).
+
+    Parameters:
+    -----------
+    store_path : str
+        Path of the HDF5 file to write (overwritten).
+    mesh : openmc.CylindricalMesh
+        The flux tally mesh.
+    full_mean, full_stdev : np.ndarray
+        Full-source flux and std-dev shaped (Energy, Z, Phi, R), as from load_tally_data.
+    matrices : dict
+        Individual source matrices ('thermal_mean', 'thermal_stdev', 'fast_mean',
+        'fast_stdev'), e.g. from create_individual_source_matrices. An optional
+        'source_indices' entry is stored as an attribute.
+    source_metadata : dict
+        Extra attributes of /sources (e.g. {'profile': 'flat', 'strengths': [...]}).
+    chunk_columns : int
+        Source columns per chunk.
+    compression, compression_opts :
+        HDF5 compression filter and level.
+    precision : str
+        Storage precision of the source matrices, 'float64', 'float32' or 'bitround'
+        (see precision.py). The full-source vectors are always kept in float64.
+    max_rel_err : float
+        Maximum relative error of 'bitround'.
+
+    Returns:
+    --------
+    dict
+        With reduced precision, the error of each matrix against the values passed in
+        (also stored as the datasets' achieved_* attributes); otherwise empty.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(store_path)), exist_ok=True)
+    mesh_dimension = tuple(int(n) for n in mesh.dimension)
+    n_sources = matrices[f'{ENERGY_GROUPS[0]}_mean'].shape[1]
+    chunks = get_matrix_chunks(mesh_dimension, n_sources, chunk_columns)
+
+    with h5py.File(store_path, 'w') as store:
+        # --- Mesh ---
+        mesh_group = store.create_group('mesh')
+        mesh_group.attrs['dimension'] = mesh_dimension
+        mesh_group['r_grid'] = np.asarray(mesh.r_grid)
+        mesh_group['phi_grid'] = np.asarray(mesh.phi_grid)
+        mesh_group['z_grid'] = np.asarray(mesh.z_grid)
+        mesh_group.create_dataset('volumes', data=np.asarray(mesh.volumes), compression=compression,
+                                  compression_opts=compression_opts)
+
+        # --- Full source ---
+        for e, group_name in enumerate(ENERGY_GROUPS):
+            group = store.create_group(f'full_source/{group_name}')
+            group.create_dataset('mean', data=np.asarray(full_mean[e]).flatten(order='F'),
+                                 compression=compression, compression_opts=compression_opts)
+            group.create_dataset('stdev', data=np.asarray(full_stdev[e]).flatten(order='F'),
+                                 compression=compression, compression_opts=compression_opts)
+
+        # --- Individual sources ---
+        sources_group = store.create_group('sources')
+        source_indices = matrices.get('source_indices')
+        if source_indices is None:
+            source_indices = np.arange(1, n_sources + 1)
+        sources_group.attrs['source_indices'] = np.asarray(source_indices, dtype=int)
+        for key, value in (source_metadata or {}).items():
+            sources_group.attrs[key] = value
+
+        reports = {}
+        for group_name in ENERGY_GROUPS:
+            group = sources_group.create_group(group_name)
+            for value in ('mean', 'stdev'):
+                key = f'{group_name}_{value}'
+                stats = _write_matrix(group, value, matrices[key], chunks, compression,
+                                      compression_opts, precision, max_rel_err)
+                if stats is not None:
+                    reports[key] = stats
+
+    print(f"Flux data saved to {store_path}")
+    if reports:
+        print_precision_report(reports, precision, max_rel_err)
+    return reports
+
+def load_flux_store(store_path):
+    """
+    Loads a whole flux store into memory.
+
+    Returns:
+        dict: 'mesh' (dict of r_grid, phi_grid, z_grid, volumes, dimension),
+        'full_source' ({group: {'mean', 'stdev'}}), the individual source matrices under the
+        create_individual_source_matrices keys, and 'source_metadata' (the /sources attributes).
+    """
+    with h5py.File(store_path, 'r') as store:
+        data = {
+            'mesh': {name: store['mesh'][name][()] for name in ('r_grid', 'phi_grid', 'z_grid', 'volumes')},
+            'full_source': {g: {v: store[f'full_source/{g}/{v}'][()] for v in ('mean', 'stdev')}
+                            for g in ENERGY_GROUPS},
+            'source_metadata': dict(store['sources'].attrs),
+        }
+        data['mesh']['dimension'] = tuple(store['mesh'].attrs['dimension'])
+        for group_name in ENERGY_GROUPS:
+            for value in ('mean', 'stdev'):
+                # Reduced-precision matrices load in their storage dtype
+                data[f'{group_name}_{value}'] = store[f'sources/{group_name}/{value}'][()]
+    return data
+
+def read_source_column(store_path, group_name, column, value='mean'):
+    """
+    Returns one source's flux (N_spatial_voxels,) from the store, reading only the
+    chunks of that column.
+    """
+    with h5py.File(store_path, 'r') as store:
+        return store[f'sources/{group_name}/{value}'][:, column]
+
+def read_voxel_row(store_path, group_name, voxel, value='mean'):
+    """
+    Returns one voxel's flux from every source (N_sources,) from the store.
+    """
+    with h5py.File(store_path, 'r') as store:
+        return store[f'sources/{group_name}/{value}'][voxel, :]
+
+def read_z_slice(store_path, group_name, z_index, value='mean'):
+    """
+    Returns the (nr*nphi x N_sources) block of one axial slice of the source matrix.
+    A z-slice is a contiguous range of mesh bins, i.e. one row of chunks.
+    """
+    with h5py.File(store_path, 'r') as store:
+        nr, nphi, _ = store['mesh'].attrs['dimension']
+        n_slice = int(nr * nphi)
+        return store[f'sources/{group_name}/{value}'][z_index * n_slice:(z_index + 1) * n_slice, :]
@@ -0,0 +1,234 @@
+import numpy as np
+import json
+import os
+
+from src.flux_decomp.run_index import load_run_index
+from src.flux_decomp.streaming import consume_stream, iter_source_columns
+
+FACTORS_FILE = 'factors.npz'
+
+class IncrementalSVD:
+    """
+    Rank-k SVD of one source matrix (N_spatial_voxels x N_sources) that is updated as
+    columns arrive (Brand's update): a block C is split into its part in span(U) and an
+    orthonormal residual, the small (k+b) x (k+b) core matrix is decomposed, and the
+    factors are rotated and truncated back to rank k. Only U (voxels x k), s and
+    Vt (k x sources) are kept, never the matrix.
+
+    It is a streaming reducer (update(source_indices, blocks)), so it can be fed by
+    consume_stream(iter_source_columns(...), svd).
+
+    After every update the history records the number of sources, the leading singular
+    values, ||M||_F, the relative error of the rank-k reconstruction of all columns seen, and
+    the subspace change: the sine of the largest principal angle between the old and
+    new leading modes (0 when the modes did not move).
+    """
+
+    def __init__(self, key='thermal_mean', rank=10, n_tracked=None, reorthogonalize_every=50):
+        self.key = key
+        self.rank = rank
+        # Modes whose subspace change is tracked (the leading ones are the ones used)
+        self.n_tracked = n_tracked or min(rank, 4)
+        self.reorthogonalize_every = reorthogonalize_every
+        self.U = None
+        self.s = np.zeros(0)
+        self.Vt = None
+        self.source_indices = np.zeros(0, dtype=int)
+        self.total_energy = 0.0
+        self.history = []
+        self.n_updates = 0
+
+    @property
+    def n_sources(self):
+        return len(self.source_indices)
+
+    def relative_error(self):
+        """Frobenius error of the rank-k factors over ||M||_F, for all columns seen."""
+        if self.total_energy <= 0:
+            return 0.0
+        residual = max(self.total_energy - float(np.sum(self.s**2)), 0.0)
+        return float(np.sqrt(residual / self.total_energy))
+
+    def update(self, source_indices, blocks):
+        block = np.asarray(blocks[self.key], dtype=float)
+        if block.ndim == 1:
+            block = block[:, np.newaxis]
+        previous = None if self.U is None else self.U[:, :self.n_tracked].copy()
+
+        if self.U is None:
+            u, s, vt = np.linalg.svd(block, full_matrices=False)
+            self.U, self.s, self.Vt = u[:, :self.rank], s[:self.rank], vt[:self.rank]
+        else:
+            self._fold_block(block)
+
+        self.source_indices = np.concatenate([self.source_indices, np.asarray(source_indices, dtype=int)])
+        self.total_energy += float(np.sum(block**2))
+        self.n_updates += 1
+        # Rounding slowly erodes the orthogonality of U; restore it now and then
+        if self.reorthogonalize_every and self.n_updates % self.reorthogonalize_every == 0:
+            self._reorthogonalize()
+        self._record(previous)
+
+    def _fold_block(self, block):
+        k = len(self.s)
+        b = block.shape[1]
+        projection = self.U.T @ block
+        residual = block - self.U @ projection
+        q, r = np.linalg.qr(residual)
+
+        core = np.zeros((k + b, k + b))
+        core[:k, :k] = np.diag(self.s)
+        core[:k, k:] = projection
+        core[k:, k:] = r
+        u_core, s_core, vt_core = np.linalg.svd(core)
+
+        keep = min(self.rank, len(s_core))
+        self.U = np.hstack([self.U, q]) @ u_core[:, :keep]
+        self.s = s_core[:keep]
+        # Vt_new = vt_core[:keep] @ [[Vt, 0], [0, I_b]]
+        vt_core = vt_core[:keep]
+        self.Vt = np.hstack([vt_core[:, :k] @ self.Vt, vt_core[:, k:]])
+
+    def _reorthogonalize(self):
+        q, r = np.linalg.qr(self.U)
+        u_r, s, vt_r = np.linalg.svd(r * self.s)
+        self.U = q @ u_r
+        self.s = s
+        self.Vt = vt_r @ self.Vt
+
+    def _record(self, previous):
+        change = None
+        if previous is not None:
+            current = self.U[:, :self.n_tracked]
+            n = min(previous.shape[1], current.shape[1])
+            # Largest principal angle between the two subspaces
+            change = float(np.linalg.norm(current[:, :n] - previous[:, :n] @ (previous[:, :n].T @ current[:, :n]), 2))
+        self.history.append({
+            'n_sources': self.n_sources,
+            'singular_values': self.s[:self.n_tracked].tolist(),
+            'frobenius_norm': float(np.sqrt(self.total_energy)),
+            'relative_error': self.relative_error(),
+            'subspace_change': change,
+        })
+
+    def is_converged(self, tol=1e-3, window=5):
+        """
+        Returns True once the leading modes have moved less than tol (subspace change)
+        and the relative spectrum s_i/||M||_F changed by less than tol, over each of the
+        last window updates, i.e. adding sources no longer changes the decomposition.
+        """
+        if len(self.history) <= window:
+            return False
+        recent = self.history[-(window + 1):]
+        for old, new in zip(recent[:-1], recent[1:]):
+            if new['subspace_change'] is None or new['subspace_change'] > tol:
+                return False
+            old_s = np.array(old['singular_values']) / (old['frobenius_norm'] or 1)
+            new_s = np.array(new['singular_values']) / (new['frobenius_norm'] or 1)
+            n = min(len(old_s), len(new_s))
+            if n == 0 or np.max(np.abs(new_s[:n] - old_s[:n])) > tol:
+                return False
+        return True
+
+    def save(self, state_dir, folded_runs=None):
+        """
+        Writes the factors, settings, history and folded runs to state_dir/factors.npz.
+        Everything is in one file replaced atomically, so the factors and the list of
+        runs folded into them can never get out of step (which would fold runs twice).
+        """
+        os.makedirs(state_dir, exist_ok=True)
+        state = {'key': self.key, 'rank': self.rank, 'n_tracked': self.n_tracked,
+                 'reorthogonalize_every': self.reorthogonalize_every,
+                 'total_energy': self.total_energy, 'n_updates': self.n_updates,
+                 'history': self.history, 'folded_runs': folded_runs or {}}
+        factors_path = os.path.join(state_dir, FACTORS_FILE)
+        tmp_path = factors_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, U=self.U if self.U is not None else np.zeros((0, 0)), s=self.s,
+                     Vt=self.Vt if self.Vt is not None else np.zeros((0, 0)),
+                     source_indices=self.source_indices, state=np.array(json.dumps(state)))
+        os.replace(tmp_path, factors_path)
+
+    @classmethod
+    def load(cls, state_dir):
+        """
+        Restores an IncrementalSVD saved with save(). Returns (svd, folded_runs).
+        """
+        factors_path = os.path.join(state_dir, FACTORS_FILE)
+        if not os.path.isfile(factors_path):
+            raise FileNotFoundError(f"No incremental SVD state in {state_dir}")
+        with np.load(factors_path) as factors:
+            state = json.loads(str(factors['state']))
+            svd = cls(state['key'], state['rank'], state['n_tracked'], state['reorthogonalize_every'])
+            svd.total_energy = state['total_energy']
+            svd.n_updates = state['n_updates']
+            svd.history = state['history']
+            svd.source_indices = factors['source_indices'].astype(int)
+            svd.s = factors['s']
+            if svd.n_sources:
+                svd.U, svd.Vt = factors['U'], factors['Vt']
+        return svd, state['folded_runs']
+
+def update_incremental_svd(target_dir, state_dir, key='thermal_mean', rank=10, tally_name='cyl_tally',
+                           block_size=1, workers=1, tol=1e-3, window=5):
+    """
+    Folds the individual source runs of a sweep that completed since the last call into
+    the incremental SVD kept in state_dir (created on the first call), so mode estimates
+    are available while the sweep is still running.
+
+    Args:
+        target_dir (str): Sweep directory holding the source_XXXX runs.
+        state_dir (str): Directory of the saved factors and history.
+        key (str): Matrix to decompose (one of SOURCE_MATRIX_KEYS).
+        rank (int): Number of modes kept (only used when creating the state).
+        tally_name (str): Name of the flux tally.
+        block_size (int): Columns folded per update.
+        workers (int): Number of statepoints read concurrently.
+        tol (float): Convergence tolerance (see IncrementalSVD.is_converged).
+        window (int): Number of consecutive updates that must stay within tol.
+    Returns:
+        IncrementalSVD: The updated decomposition.
+        bool: Whether its spectrum and leading modes have converged.
+    """
+    if os.path.isfile(os.path.join(state_dir, FACTORS_FILE)):
+        svd, folded_runs = IncrementalSVD.load(state_dir)
+        if svd.key != key:
+            raise ValueError(f"{state_dir} holds the SVD of '{svd.key}', not '{key}'.")
+    else:
+        svd, folded_runs = IncrementalSVD(key, rank), {}
+
+    run_index = load_run_index(target_dir, refresh=True)
+    new_runs = {}
+    for name, entry in run_index['runs'].items():
+        if entry['status'] != 'complete':
+            continue
+        stamp = [entry['statepoint'], entry['size'], entry['mtime_ns']]
+        if name not in folded_runs:
+            new_runs[name] = entry
+        elif folded_runs[name] != stamp:
+            # A folded column cannot be taken back out of the factors
+            print(f"  {name} changed after it was folded in; rebuild {state_dir} to use the new statepoint.")
+
+    if new_runs:
+        errors = {}
+        stream = iter_source_columns(target_dir, tally_name, block_size, keys=(key,), workers=workers,
+                                     errors=errors, run_index={'runs': new_runs})
+        folded = consume_stream(stream, svd)
+        for name, entry in new_runs.items():
+            if entry['source'] in folded:
+                folded_runs[name] = [entry['statepoint'], entry['size'], entry['mtime_ns']]
+        for run_dir, message in errors.items():
+            print(f"  Skipped {run_dir}: {message}")
+        svd.save(state_dir, folded_runs)
+
+    converged = svd.is_converged(tol, window)
+    if svd.n_sources:
+        last = svd.history[-1]
+        leading = ', '.join(f"{v:.4e}" for v in last['singular_values'])
+        print(f"Folded {len(new_runs)} new runs; {svd.n_sources} sources in the rank-{svd.rank} SVD of {key}.")
+        print(f"  Leading singular values: {leading}")
+        change = f"{last['subspace_change']:.3e}" if last['subspace_change'] is not None else '-'
+        print(f"  Relative error: {last['relative_error']:.3e}, subspace change: {change}, converged: {converged}")
+    else:
+        print(f"No complete runs to fold into the SVD of {key} yet.")
+    return svd, converged
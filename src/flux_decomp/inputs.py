@@ -11,7 +11,7 @@ sys.path.append(project_root)
 from models.msrr.lattice_data import get_pin_rows
 
 # --- Base Settings ---
-def get_base_settings():
+def get_base_settings(batches=100, particles=100000):
     """
     Returns the base settings for all simulations.
     NO SOURCE is defined here.
@@ -20,26 +20,116 @@ def get_base_settings():
     settings.run_mode = 'fixed source'
     settings.create_fission_neutrons = False
     settings.temperature = {'method': 'interpolation'}
-    settings.batches = 100
-    settings.particles = 100000
+    settings.batches = batches
+    settings.particles = particles
     
     return settings
 
-# --- Tallies ---
-def get_flux_tallies():
+def apply_precision_trigger(settings, tallies, rel_err, min_batches=10, max_batches=1000,
+                            batch_interval=1, roi=None):
     """
-    Returns a tallies object for flux.
+    Switches a run from a fixed batch count to a precision target: the run stops as soon
+    as every nonzero flux bin of the trigger tally has a relative error below rel_err,
+    or after max_batches. Modifies settings and tallies in place.
+
+    Parameters:
+    -----------
+    settings : openmc.Settings
+        Settings from get_base_settings.
+    tallies : openmc.Tallies
+        Tallies from get_flux_tallies.
+    rel_err : float
+        Target relative error on the flux.
+    min_batches : int
+        Batches always run before the trigger is first checked.
+    max_batches : int
+        Batch limit if the target is never reached.
+    batch_interval : int
+        Batches between trigger checks.
+    roi : tuple
+        Optional (r_min, r_max) in cm. If given, the target only applies to a separate
+        trigger tally covering that radial range instead of all of cyl_tally.
     """
-    ### Cylindrical Mesh Tally ###
-    tallies = openmc.Tallies()
+    trigger = openmc.Trigger('rel_err', rel_err, ignore_zeros=True)
+    trigger.scores = ['flux']
 
-    # Create cylindrical mesh which will be used for tally
+    if roi is None:
+        tallies[0].triggers = [trigger]
+    else:
+        roi_tally = get_roi_trigger_tally(*roi)
+        roi_tally.triggers = [trigger]
+        tallies.append(roi_tally)
+
+    settings.batches = min_batches
+    settings.trigger_active = True
+    settings.trigger_max_batches = max_batches
+    settings.trigger_batch_interval = batch_interval
+
+    return settings, tallies
+
+# --- Source Tagging ---
+# Spacing (in seconds) between the birth times given to tagged source components.
+# Every history in this fixed-source model ends long before this much time has passed,
+# so the time bin a score falls in identifies the component the history started from.
+SOURCE_TAG_INTERVAL = 1.0e4
+
+def tag_source_components(sources, interval=SOURCE_TAG_INTERVAL):
+    """
+    Gives source component i a fixed birth time of i * interval (modifies the sources in place).
+    Time has no effect on transport here; it only labels each history with its component.
+    """
+    for i, source in enumerate(sources):
+        source.time = openmc.stats.Discrete([i * interval], [1.0])
+    return sources
+
+def get_source_tag_filter(n_sources, interval=SOURCE_TAG_INTERVAL):
+    """
+    Returns a TimeFilter with one bin per tagged source component.
+    """
+    return openmc.TimeFilter(np.arange(n_sources + 1) * interval)
+
+# --- Tallies ---
+def get_flux_mesh_grids():
+    """
+    Returns the (r, phi, z) bin edges of the cylindrical flux mesh.
+    """
     r_grid = np.linspace(0, 129.8, 41)  # 0 to 129.8 (end of absorber wall)
     #r_grid = np.array([])              # custom r values in each material
     #z_grid = np.linspace(-10,10,4)
     phi_grid = np.linspace(0, 2*np.pi, 96) # 96 divisions
     z_grid = np.array([-10,-9.9,9.9,10])
 
+    return r_grid, phi_grid, z_grid
+
+def get_roi_trigger_tally(r_min, r_max):
+    """
+    Returns a flux tally on the cyl_tally mesh restricted to r_min <= r <= r_max.
+    It only exists to carry a precision trigger for a region of interest.
+    """
+    r_grid, phi_grid, z_grid = get_flux_mesh_grids()
+    r_roi = r_grid[(r_grid >= r_min) & (r_grid <= r_max)]
+    if len(r_roi) < 2:
+        raise ValueError(f"Region of interest r=[{r_min}, {r_max}] does not contain a mesh ring.")
+
+    roi_mesh = openmc.CylindricalMesh(r_roi, z_grid, phi_grid, np.array([0,0,0]))
+
+    tally = openmc.Tally(name='roi_trigger_tally')
+    tally.filters = [openmc.MeshFilter(roi_mesh), openmc.EnergyFilter([0.0, 0.625, 20.0e6])]
+    tally.scores = ['flux']
+    return tally
+
+def get_flux_tallies(n_source_tags=None):
+    """
+    Returns a tallies object for flux.
+    If n_source_tags is given, cyl_tally also gets a per-component source tag filter
+    (see tag_source_components).
+    """
+    ### Cylindrical Mesh Tally ###
+    tallies = openmc.Tallies()
+
+    # Create cylindrical mesh which will be used for tally
+    r_grid, phi_grid, z_grid = get_flux_mesh_grids()
+
     origin = np.array([0,0,0])
     cyl_mesh = openmc.CylindricalMesh(r_grid, z_grid, phi_grid, origin)
 
@@ -53,6 +143,8 @@ def get_flux_tallies():
     # Create tally to score flux and absorption rate
     tally = openmc.Tally(name='cyl_tally')
     tally.filters = [mesh_filter, energy_filter]
+    if n_source_tags is not None:
+        tally.filters.append(get_source_tag_filter(n_source_tags))
     tally.scores = ['flux']
 
     tallies.append(tally)
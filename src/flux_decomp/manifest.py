@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import xml.etree.ElementTree as ET
+
+from src.flux_decomp.processing import find_final_statepoint
+
+MANIFEST_NAME = 'manifest.json'
+
+# The exported XML fully describes a run: settings.xml carries the batch/particle
+# settings and the source definition, the others the shared model.
+INPUT_FILES = ('settings.xml', 'geometry.xml', 'materials.xml', 'tallies.xml')
+
+# Settings elements naming an input file outside the XML, whose contents are hashed too
+REFERENCED_FILE_ELEMENTS = ('weight_windows_file',)
+
+def compute_input_hash(run_dir, file_names=INPUT_FILES, file_cache=None):
+    """
+    Returns a SHA-256 hash of the XML inputs exported into run_dir, including the
+    contents of the files settings.xml points to (e.g. the shared weight-window file), so
+    regenerating those invalidates the runs that use them.
+
+    Args:
+        run_dir (str): Directory holding the run's XML inputs.
+        file_names (tuple): Input files included in the hash (missing files are skipped).
+        file_cache (dict): Optional cache of file contents keyed by real path. Passing the
+            same dict for a whole sweep reads shared (symlinked) model files only once.
+
+    Returns:
+        str: Hex digest identifying the run's inputs.
+    """
+    digest = hashlib.sha256()
+    for file_name in file_names:
+        path = os.path.join(run_dir, file_name)
+        if not os.path.isfile(path):
+            continue
+        digest.update(file_name.encode())
+        digest.update(_read_input_file(path, file_cache))
+    for element, path in _get_referenced_files(run_dir):
+        digest.update(element.encode())
+        digest.update(_read_input_file(path, file_cache, shared=True))
+    return digest.hexdigest()
+
+def _get_referenced_files(run_dir):
+    """
+    Returns (element, path) of the files referenced by the run's settings.xml.
+    A referenced file that does not exist raises FileNotFoundError.
+    """
+    settings_path = os.path.join(run_dir, 'settings.xml')
+    if not os.path.isfile(settings_path):
+        return []
+    root = ET.parse(settings_path).getroot()
+    referenced = []
+    for element in REFERENCED_FILE_ELEMENTS:
+        node = root.find(element)
+        if node is None or not (node.text or '').strip():
+            continue
+        path = os.path.join(run_dir, node.text.strip())
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"{element} of {settings_path} not found: {path}")
+        referenced.append((element, path))
+    return referenced
+
+def _read_input_file(path, file_cache=None, shared=False):
+    """
+    Reads an input file, caching the contents of symlinked or otherwise shared files.
+    """
+    if file_cache is not None and (shared or os.path.islink(path)):
+        real_path = os.path.realpath(path)
+        if real_path not in file_cache:
+            with open(real_path, 'rb') as f:
+                file_cache[real_path] = f.read()
+        return file_cache[real_path]
+
+    with open(path, 'rb') as f:
+        return f.read()
+
+def load_manifest(manifest_path):
+    """
+    Loads a sweep manifest, returning an empty manifest if none exists yet.
+    The manifest maps run names (e.g. "source_0001") to
+    {'input_hash': str, 'status': 'complete' | 'failed', 'statepoint': str, 'error': str}.
+    """
+    if not os.path.isfile(manifest_path):
+        return {}
+    with open(manifest_path) as f:
+        return json.load(f)
+
+def save_manifest(manifest, manifest_path):
+    """
+    Writes the manifest atomically so a crash mid-sweep never leaves it truncated.
+    """
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+def is_run_current(manifest, run_dir, input_hash):
+    """
+    Returns True if run_dir finished successfully with exactly these inputs
+    and its final statepoint is still on disk.
+    """
+    entry = manifest.get(os.path.basename(run_dir))
+    if entry is None:
+        return False
+    if entry.get('status') != 'complete' or entry.get('input_hash') != input_hash:
+        return False
+    statepoint = entry.get('statepoint')
+    return statepoint is not None and os.path.isfile(os.path.join(run_dir, statepoint))
+
+def record_run(manifest, run_dir, input_hash, status, error=None):
+    """
+    Records the outcome of a run in the manifest (in place).
+    """
+    statepoint = find_final_statepoint(run_dir) if status == 'complete' else None
+    manifest[os.path.basename(run_dir)] = {
+        'input_hash': input_hash,
+        'status': status,
+        'statepoint': os.path.basename(statepoint) if statepoint else None,
+        'error': error,
+    }
@@ -0,0 +1,216 @@
+import numpy as np
+import os
+import shutil
+
+from src.flux_decomp.manifest import load_manifest, save_manifest
+from src.flux_decomp.processing import (
+    SOURCE_MATRIX_KEYS,
+    allocate_matrix,
+    check_column_length,
+    compact_columns,
+    find_source_statepoints,
+    get_source_number,
+    read_source_statepoints,
+    read_voxel_count
+)
+
+STORE_INDEX_NAME = 'index.json'
+
+def _get_matrix_dir(store_dir, index):
+    """Returns the generation directory holding the .npy matrices the index points to."""
+    return os.path.join(store_dir, index.get('generation', ''))
+
+def _next_generation(index):
+    current = index.get('generation')
+    number = int(current.split('_')[-1]) + 1 if current else 1
+    return f'generation_{number:04d}'
+
+def get_statepoint_stamp(statepoint_path):
+    """
+    Returns what identifies one version of a statepoint: its file name, size and
+    modification time (a re-run rewrites the file, changing at least the mtime).
+    """
+    stat = os.stat(statepoint_path)
+    return {'statepoint': os.path.basename(statepoint_path),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns}
+
+def load_matrix_store(store_dir, mmap_mode='r'):
+    """
+    Opens a matrix store written by update_matrix_store.
+
+    Args:
+        store_dir (str): Directory of the store.
+        mmap_mode (str): Memory-map mode of the .npy matrices ('r', 'r+', or None to load them).
+    Returns:
+        dict: The four thermal/fast mean and stdev matrices (N_spatial_voxels x N_sources)
+        and 'source_indices' (the 1-based source number of each column).
+    """
+    index = load_manifest(os.path.join(store_dir, STORE_INDEX_NAME))
+    if not index:
+        raise FileNotFoundError(f"No matrix store index in {store_dir}")
+
+    matrix_dir = _get_matrix_dir(store_dir, index)
+    matrices = {key: np.load(os.path.join(matrix_dir, f'{key}.npy'), mmap_mode=mmap_mode)
+                for key in SOURCE_MATRIX_KEYS}
+    matrices['source_indices'] = np.array([c['source'] for c in index['columns']], dtype=int)
+    return matrices
+
+def update_matrix_store(target_dir, store_dir, tally_name='cyl_tally', workers=1, executor='thread'):
+    """
+    Brings a persistent matrix store up to date with the individual source runs in
+    target_dir, re-reading only the statepoints that were added or changed since the
+    last update.
+
+    The store keeps one disk-backed .npy file per matrix ({key}.npy, Fortran order) in a
+    generation directory, and an index.json with that directory and the source number and
+    statepoint stamp (see get_statepoint_stamp) of every column. If only existing sources
+    changed, their columns are overwritten in place. If sources were added or removed, the
+    matrices are rebuilt in a new generation directory with the unchanged columns copied
+    over from the old files; writing the index switches the store to it, so an interrupted
+    rebuild leaves the previous generation intact.
+
+    Args:
+        target_dir (str): Sweep directory holding the source_XXXX runs.
+        store_dir (str): Directory of the store (created if needed).
+        tally_name (str): Name of the flux tally.
+        workers (int): Number of statepoints read concurrently.
+        executor (str): 'thread' or 'process' pool for workers > 1.
+    Returns:
+        dict: The store's matrices (read-only memmaps) and 'source_indices', plus 'updated'
+        (source numbers re-read) and 'errors' (run directory -> error message). A changed
+        statepoint that fails to read keeps its previous column and is retried next time.
+        If no statepoint in target_dir can be read, the existing store is returned as is.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    index_path = os.path.join(store_dir, STORE_INDEX_NAME)
+    index = load_manifest(index_path)
+
+    tasks, errors = find_source_statepoints(target_dir)
+    stamps = {run_dir: get_statepoint_stamp(sp_file) for run_dir, sp_file in tasks}
+
+    # --- Check that the stored columns are still compatible ---
+    n_voxels = None
+    for run_dir, sp_file in tasks:
+        try:
+            n_voxels = read_voxel_count(sp_file, tally_name)
+            break
+        except Exception as e:
+            errors[run_dir] = f"{e} (File: {sp_file})"
+    if n_voxels is None:
+        if not index:
+            raise ValueError(f"No readable statepoint in {target_dir} to build a matrix store from.")
+        print(f"Warning: no statepoint in {target_dir} could be read; keeping the matrix store in {store_dir}.")
+        matrices = load_matrix_store(store_dir)
+        matrices.update({'updated': [], 'errors': errors})
+        return matrices
+
+    old_columns = index.get('columns', [])
+    if index and (index.get('tally_name') != tally_name or index.get('n_voxels') != n_voxels):
+        print(f"Matrix store in {store_dir} was built for a different tally or mesh; rebuilding it.")
+        old_columns = []
+    old_positions = {c['source']: position for position, c in enumerate(old_columns)}
+
+    stale = [(run_dir, sp_file) for run_dir, sp_file in tasks
+             if get_source_number(run_dir) not in old_positions
+             or old_columns[old_positions[get_source_number(run_dir)]]['stamp'] != stamps[run_dir]]
+    same_layout = bool(old_columns) and [get_source_number(r) for r, _ in tasks] == [c['source'] for c in old_columns]
+
+    if same_layout and not stale:
+        print(f"Matrix store in {store_dir} is up to date ({len(old_columns)} sources).")
+        matrices = load_matrix_store(store_dir)
+        matrices.update({'updated': [], 'errors': errors})
+        return matrices
+
+    generation = index.get('generation')
+    if same_layout:
+        # --- Only existing sources changed: overwrite their columns in place ---
+        # A crash before the index is written leaves these columns with their old stamps,
+        # so they are re-read next time
+        matrix_dir = _get_matrix_dir(store_dir, index)
+        matrices = {key: np.load(os.path.join(matrix_dir, f'{key}.npy'), mmap_mode='r+')
+                    for key in SOURCE_MATRIX_KEYS}
+        columns = [dict(c) for c in old_columns]
+        positions = [old_positions[get_source_number(run_dir)] for run_dir, _ in stale]
+
+        def store_columns(task_position, source_columns):
+            check_column_length(source_columns, n_voxels)
+            run_dir = stale[task_position][0]
+            position = positions[task_position]
+            for key, column in zip(SOURCE_MATRIX_KEYS, source_columns):
+                matrices[key][:, position] = column
+            columns[position]['stamp'] = stamps[run_dir]
+
+        errors.update(read_source_statepoints(stale, tally_name, store_columns, workers, executor))
+        for matrix in matrices.values():
+            matrix.flush()
+    else:
+        # --- Sources added or removed: build the new layout in a new generation ---
+        # Leftovers of an interrupted rebuild are not referenced by the index
+        for name in os.listdir(store_dir):
+            if name.startswith('generation_') and name != generation:
+                shutil.rmtree(os.path.join(store_dir, name), ignore_errors=True)
+        old_matrix_dir = _get_matrix_dir(store_dir, index)
+        generation = _next_generation(index)
+        new_matrix_dir = os.path.join(store_dir, generation)
+        n_columns = len(tasks)
+        matrices = {key: allocate_matrix((n_voxels, n_columns), key, new_matrix_dir)
+                    for key in SOURCE_MATRIX_KEYS}
+        old_matrices = {}
+        if old_columns:
+            old_matrices = {key: np.load(os.path.join(old_matrix_dir, f'{key}.npy'), mmap_mode='r')
+                            for key in SOURCE_MATRIX_KEYS}
+        columns = [{'source': get_source_number(run_dir), 'stamp': None} for run_dir, _ in tasks]
+
+        def copy_old_column(position):
+            source = columns[position]['source']
+            for key in SOURCE_MATRIX_KEYS:
+                matrices[key][:, position] = old_matrices[key][:, old_positions[source]]
+            columns[position]['stamp'] = old_columns[old_positions[source]]['stamp']
+
+        stale_names = {run_dir for run_dir, _ in stale}
+        for position, (run_dir, _) in enumerate(tasks):
+            if run_dir not in stale_names:
+                copy_old_column(position)
+
+        stale_positions = [position for position, (run_dir, _) in enumerate(tasks) if run_dir in stale_names]
+
+        def store_columns(task_position, source_columns):
+            check_column_length(source_columns, n_voxels)
+            position = stale_positions[task_position]
+            for key, column in zip(SOURCE_MATRIX_KEYS, source_columns):
+                matrices[key][:, position] = column
+            columns[position]['stamp'] = stamps[tasks[position][0]]
+
+        errors.update(read_source_statepoints(stale, tally_name, store_columns, workers, executor))
+
+        # Failed re-reads of known sources fall back to their old column; new sources that
+        # failed are left out
+        for position, column in enumerate(columns):
+            if column['stamp'] is None and column['source'] in old_positions:
+                copy_old_column(position)
+        kept = np.array([position for position, c in enumerate(columns) if c['stamp'] is not None], dtype=int)
+        if len(kept) < n_columns:
+            for key in SOURCE_MATRIX_KEYS:
+                matrices[key] = compact_columns(matrices[key], kept, key, new_matrix_dir)
+        columns = [columns[position] for position in kept]
+
+        for matrix in matrices.values():
+            matrix.flush()
+        matrices.clear()
+        old_matrices.clear()
+
+    # Writing the index is what switches the store to the new generation
+    save_manifest({'tally_name': tally_name, 'n_voxels': n_voxels, 'generation': generation,
+                   'columns': columns}, index_path)
+    if index.get('generation') and index['generation'] != generation:
+        shutil.rmtree(_get_matrix_dir(store_dir, index), ignore_errors=True)
+
+    updated = sorted(get_source_number(run_dir) for run_dir, _ in stale if run_dir not in errors)
+    print(f"Matrix store in {store_dir}: re-read {len(updated)} of {len(columns)} sources.")
+    if errors:
+        print(f"Warning: {len(errors)} source runs could not be read (see 'errors').")
+
+    matrices = load_matrix_store(store_dir)
+    matrices.update({'updated': updated, 'errors': errors})
+    return matrices
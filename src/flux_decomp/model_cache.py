@@ -0,0 +1,111 @@
+import openmc
+import hashlib
+import os
+import shutil
+import sys
+
+# --- This block must run first to make 'models' and 'src' available ---
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if project_root not in sys.path:
+    sys.path.append(project_root)
+# ---------------------------------------------------------------------
+from models.msrr.build_materials import get_materials_dict
+from models.msrr.build_geometry import get_geometry
+
+# The model builders: any edit to these files produces a new cache entry
+MODEL_BUILDER_FILES = (
+    os.path.join('models', 'msrr', 'build_materials.py'),
+    os.path.join('models', 'msrr', 'build_geometry.py'),
+    os.path.join('models', 'msrr', 'lattice_data.py'),
+)
+
+DEFAULT_CACHE_DIR = os.path.join(project_root, 'data', 'model_cache')
+
+def get_cross_sections_path():
+    """
+    Returns the cross_sections.xml OpenMC is configured with (openmc.config, else the
+    OPENMC_CROSS_SECTIONS variable), or None if none is set.
+    """
+    path = None
+    config = getattr(openmc, 'config', None)
+    if config is not None:
+        path = config.get('cross_sections')
+    if path is None:
+        path = os.environ.get('OPENMC_CROSS_SECTIONS')
+    return None if path is None else os.fspath(path)
+
+def get_model_key():
+    """
+    Returns a hash of the model builder inputs: the builder source files, the
+    OpenMC version that serializes the model, and the cross-section library
+    (add_element expands elements into the nuclides that library provides).
+    """
+    digest = hashlib.sha256()
+    digest.update(openmc.__version__.encode())
+    cross_sections = get_cross_sections_path()
+    if cross_sections is not None and os.path.isfile(cross_sections):
+        # The library index lists every nuclide; hash its contents, not only its path
+        digest.update(os.path.realpath(cross_sections).encode())
+        with open(cross_sections, 'rb') as f:
+            digest.update(f.read())
+    else:
+        digest.update(str(cross_sections).encode())
+    for relative_path in MODEL_BUILDER_FILES:
+        digest.update(relative_path.encode())
+        with open(os.path.join(project_root, relative_path), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+def get_cached_model_dir(cache_dir=DEFAULT_CACHE_DIR, rebuild=False):
+    """
+    Returns the cache directory holding geometry.xml and materials.xml for the current
+    model builders, building and exporting the model first if it is not cached yet.
+
+    Parameters:
+    -----------
+    cache_dir : str
+        Root directory of the model cache.
+    rebuild : bool
+        Rebuild the entry even if it already exists.
+    """
+    entry_dir = os.path.join(cache_dir, get_model_key())
+    complete = all(os.path.isfile(os.path.join(entry_dir, f)) for f in ('geometry.xml', 'materials.xml'))
+    if complete and not rebuild:
+        return entry_dir
+
+    print(f"Building model and caching it in {entry_dir}...")
+    materials_dict = get_materials_dict()
+    geometry = get_geometry(materials_dict)
+    materials = openmc.Materials(materials_dict.values())
+
+    # Export to a private directory and move it into place, so concurrent workers
+    # never load a half-written entry
+    tmp_dir = f"{entry_dir}.tmp{os.getpid()}"
+    os.makedirs(tmp_dir, exist_ok=True)
+    materials.export_to_xml(os.path.join(tmp_dir, 'materials.xml'))
+    geometry.export_to_xml(os.path.join(tmp_dir, 'geometry.xml'))
+
+    if rebuild and os.path.isdir(entry_dir):
+        shutil.rmtree(entry_dir)
+    try:
+        os.rename(tmp_dir, entry_dir)
+    except OSError:
+        # Another worker created the same entry first; its files are identical
+        shutil.rmtree(tmp_dir)
+
+    return entry_dir
+
+def get_cached_model(cache_dir=DEFAULT_CACHE_DIR, rebuild=False):
+    """
+    Returns (geometry, materials) for the MSRR model, loaded from the model cache
+    instead of being rebuilt from the builder functions.
+
+    Returns:
+    --------
+    geometry : openmc.Geometry
+    materials : openmc.Materials
+    """
+    entry_dir = get_cached_model_dir(cache_dir, rebuild)
+    materials = openmc.Materials.from_xml(os.path.join(entry_dir, 'materials.xml'))
+    geometry = openmc.Geometry.from_xml(os.path.join(entry_dir, 'geometry.xml'), materials)
+    return geometry, materials
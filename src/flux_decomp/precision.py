@@ -0,0 +1,125 @@
+import numpy as np
+
+# Storage precision modes of the flux matrices:
+#   float64  - full precision (default)
+#   float32  - half the memory/disk, relative error <= 2**-24 for normal values
+#   bitround - mantissa rounded to the fewest bits meeting max_rel_err; stored as float32
+#              when that is exact, and in any case compresses well (trailing zero bits)
+PRECISION_MODES = ('float64', 'float32', 'bitround')
+
+FLOAT32_MANTISSA_BITS = 23
+FLOAT64_MANTISSA_BITS = 52
+FLOAT32_INFO = np.finfo(np.float32)
+
+def get_keep_bits(max_rel_err):
+    """
+    Returns the number of mantissa bits to keep so that rounding to nearest has a
+    relative error of at most max_rel_err (keeping k bits gives at most 2**-(k+1)).
+    """
+    if not 0 < max_rel_err < 1:
+        raise ValueError(f"max_rel_err must be between 0 and 1, not {max_rel_err}.")
+    keep_bits = int(np.ceil(-np.log2(max_rel_err) - 1))
+    return min(max(keep_bits, 0), FLOAT64_MANTISSA_BITS)
+
+def get_storage_dtype(mode='float64', max_rel_err=None):
+    """
+    Returns the dtype a matrix is stored in for a precision mode.
+    """
+    if mode not in PRECISION_MODES:
+        raise ValueError(f"Unknown precision mode '{mode}'. Choose from {PRECISION_MODES}.")
+    if mode == 'float64':
+        return np.dtype(np.float64)
+    if mode == 'float32':
+        return np.dtype(np.float32)
+    if max_rel_err is None:
+        raise ValueError("The 'bitround' precision mode needs max_rel_err.")
+    # A value with at most 23 mantissa bits is exactly representable in float32
+    if get_keep_bits(max_rel_err) <= FLOAT32_MANTISSA_BITS:
+        return np.dtype(np.float32)
+    return np.dtype(np.float64)
+
+def bit_round(values, keep_bits):
+    """
+    Rounds float64 values to nearest with keep_bits mantissa bits (the dropped bits
+    are zero, which the HDF5 shuffle+gzip filters compress well). Zeros stay zero.
+    """
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    drop_bits = FLOAT64_MANTISSA_BITS - keep_bits
+    if drop_bits <= 0:
+        return values.copy()
+
+    bits = values.view(np.uint64)
+    half = np.uint64(1) << np.uint64(drop_bits - 1)
+    mask = ~((np.uint64(1) << np.uint64(drop_bits)) - np.uint64(1))
+    return ((bits + half) & mask).view(np.float64)
+
+def check_float32_range(values):
+    """
+    Raises ValueError if a nonzero value would overflow float32 or underflow to a
+    subnormal (or zero), where the relative error bounds no longer hold.
+    """
+    magnitudes = np.abs(np.asarray(values, dtype=np.float64))
+    nonzero = magnitudes[magnitudes != 0]
+    if not nonzero.size:
+        return
+    smallest, largest = nonzero.min(), nonzero.max()
+    if largest > FLOAT32_INFO.max or smallest < FLOAT32_INFO.tiny:
+        raise ValueError(f"Values span {smallest:.3e} to {largest:.3e}, outside the float32 range "
+                         f"[{FLOAT32_INFO.tiny:.3e}, {FLOAT32_INFO.max:.3e}]; store them with precision='float64'.")
+
+def reduce_precision(values, mode='float64', max_rel_err=None):
+    """
+    Returns values converted to the storage precision of a mode (see PRECISION_MODES).
+    Values outside the float32 range raise ValueError when the mode stores float32.
+    """
+    dtype = get_storage_dtype(mode, max_rel_err)
+    if mode == 'bitround':
+        values = bit_round(values, get_keep_bits(max_rel_err))
+    if dtype == np.float32:
+        # Checked after rounding, which can carry a value just below the maximum over it
+        check_float32_range(values)
+    return np.asarray(values).astype(dtype, copy=False)
+
+def compare_precision(original, reduced, stats=None):
+    """
+    Accumulates the error of reduced-precision values against their float64 original.
+    Call it once per column (or block) with the same stats dict to cover a whole matrix.
+
+    Returns:
+        dict: 'max_rel_err' and 'rms_rel_err' over the nonzero original values, 'max_abs_err',
+        and the running totals 'sum_sq_rel_err', 'n_nonzero' and 'n_values'.
+    """
+    if stats is None:
+        stats = {'max_rel_err': 0.0, 'rms_rel_err': 0.0, 'max_abs_err': 0.0,
+                 'sum_sq_rel_err': 0.0, 'n_nonzero': 0, 'n_values': 0}
+
+    original = np.asarray(original, dtype=np.float64)
+    abs_err = np.abs(np.asarray(reduced, dtype=np.float64) - original)
+    nonzero = original != 0
+    rel_err = abs_err[nonzero] / np.abs(original[nonzero])
+
+    stats['n_values'] += original.size
+    if abs_err.size:
+        stats['max_abs_err'] = max(stats['max_abs_err'], float(abs_err.max()))
+    if rel_err.size:
+        stats['max_rel_err'] = max(stats['max_rel_err'], float(rel_err.max()))
+        stats['sum_sq_rel_err'] += float(np.sum(rel_err ** 2))
+        stats['n_nonzero'] += int(rel_err.size)
+        stats['rms_rel_err'] = float(np.sqrt(stats['sum_sq_rel_err'] / stats['n_nonzero']))
+    return stats
+
+def print_precision_report(reports, mode, max_rel_err=None):
+    """
+    Prints the error and storage size of each reduced-precision matrix.
+
+    Args:
+        reports (dict): Matrix name -> stats from compare_precision.
+        mode (str): The precision mode used.
+        max_rel_err (float): The requested bound (bitround).
+    """
+    dtype = get_storage_dtype(mode, max_rel_err)
+    bound = f", requested max rel. error {max_rel_err:.1e}" if max_rel_err is not None else ""
+    print(f"Precision '{mode}' ({dtype.name}, {dtype.itemsize} bytes/value{bound}):")
+    for name, stats in reports.items():
+        print(f"  {name:<14} max rel. error {stats['max_rel_err']:.2e}, "
+              f"rms rel. error {stats['rms_rel_err']:.2e}, max abs. error {stats['max_abs_err']:.2e}")
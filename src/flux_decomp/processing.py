@@ -1,7 +1,18 @@
 import openmc
 import numpy as np
+import h5py
+import json
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from src.flux_decomp.precision import compare_precision, get_storage_dtype, print_precision_report, reduce_precision
+
+# Written next to a one-pass (source-tagged) run: probability of each source component
+SOURCE_TAGS_FILE = 'source_tags.json'
+
+# Matrices assembled from the individual source runs (N_spatial_voxels x N_sources)
+SOURCE_MATRIX_KEYS = ('thermal_mean', 'thermal_stdev', 'fast_mean', 'fast_stdev')
 
 def load_tally_data(statepoint_path, tally_name='cyl_tally', value_type='mean', mesh=False):
     """
@@ -49,70 +60,399 @@ def load_tally_data(statepoint_path, tally_name='cyl_tally', value_type='mean',
     else:
         return shaped_data
 
-def create_individual_source_matrices(base_dir='data/run_individual_sources_flat', tally_name='cyl_tally'):
+def _find_tally_group(statepoint, tally_name):
+    """
+    Returns the HDF5 group of the named tally in an open statepoint file.
+    """
+    tallies_group = statepoint['tallies']
+    for key in tallies_group:
+        if not key.startswith('tally '):
+            continue
+        group = tallies_group[key]
+        if 'name' in group and group['name'][()].decode() == tally_name:
+            return group
+    raise KeyError(f"Tally '{tally_name}' not found in {statepoint.filename}")
+
+def _read_tally_filters(statepoint, tally_group):
+    """
+    Returns the tally's filters, in tally order, as a list of dicts with the filter
+    'type' (e.g. 'mesh', 'energy', 'time'), 'n_bins' and 'bins'. Mesh filters also
+    carry the mesh 'dimension'.
+    """
+    filters = []
+    if tally_group['n_filters'][()] == 0:
+        return filters
+
+    for filter_id in tally_group['filters'][()]:
+        filter_group = statepoint[f'tallies/filters/filter {filter_id}']
+        filter_info = {
+            'type': filter_group['type'][()].decode(),
+            'n_bins': int(filter_group['n_bins'][()]),
+            'bins': filter_group['bins'][()],
+        }
+        if filter_info['type'] == 'mesh':
+            mesh_id = int(np.ravel(filter_info['bins'])[0])
+            mesh_group = statepoint[f'tallies/meshes/mesh {mesh_id}']
+            filter_info['dimension'] = tuple(int(n) for n in mesh_group['dimension'][()])
+        filters.append(filter_info)
+    return filters
+
+def _compute_mean_std(sum_, sum_sq, n_realizations):
+    """
+    Computes tally mean and standard deviation of the mean from the accumulated
+    sum and sum of squares (same convention as openmc.Tally).
+    """
+    mean = sum_ / n_realizations
+    std_dev = np.zeros_like(mean)
+    if n_realizations > 1:
+        nonzero = np.abs(mean) > 0
+        std_dev[nonzero] = np.sqrt(
+            (sum_sq[nonzero] / n_realizations - mean[nonzero] ** 2) / (n_realizations - 1))
+    return mean, std_dev
+
+def read_tally_results(statepoint_path, tally_name='cyl_tally'):
+    """
+    Reads one tally's mean and standard deviation from a statepoint with h5py, opening
+    the file once and touching only that tally's results and filter metadata.
+    Parameters:
+        statepoint_path (str): Path to the OpenMC statepoint file.
+        tally_name (str): Name of the tally to extract.
+    Returns:
+        np.ndarray: Flattened mean (one value per filter bin, nuclides/scores squeezed).
+        np.ndarray: Flattened standard deviation.
+        list: Filter metadata (see _read_tally_filters).
+    """
+    with h5py.File(statepoint_path, 'r') as statepoint:
+        tally_group = _find_tally_group(statepoint, tally_name)
+        filters = _read_tally_filters(statepoint, tally_group)
+        n_realizations = int(tally_group['n_realizations'][()])
+        results = tally_group['results'][()]
+
+    mean, std_dev = _compute_mean_std(results[..., 0], results[..., 1], n_realizations)
+    return np.squeeze(mean), np.squeeze(std_dev), filters
+
+def load_tally_mean_std(statepoint_path, tally_name='cyl_tally'):
+    """
+    Load tally mean AND standard deviation from an OpenMC statepoint file in one pass.
+    Lightweight replacement for calling load_tally_data twice: the statepoint is opened
+    once with h5py instead of being parsed into an openmc.StatePoint.
+    Parameters:
+        statepoint_path (str): Path to the OpenMC statepoint file.
+        tally_name (str): Name of the tally (with mesh and energy filters) to extract.
+    Returns:
+        np.ndarray: Mean with dimensions (Energy, Z, Phi, R), as load_tally_data.
+        np.ndarray: Standard deviation with the same dimensions.
+    """
+    mean, std_dev, filters = read_tally_results(statepoint_path, tally_name)
+
+    filter_types = [f['type'] for f in filters]
+    if filter_types != ['mesh', 'energy']:
+        raise ValueError(f"Tally '{tally_name}' has filters {filter_types}; expected ['mesh', 'energy'].")
+    nr, nphi, nz = filters[0]['dimension']
+    n_energy = filters[1]['n_bins']
+
+    # Same reshape as load_tally_data
+    mean = mean.reshape(nr, nphi, nz, n_energy).T
+    std_dev = std_dev.reshape(nr, nphi, nz, n_energy).T
+    return mean, std_dev
+
+def split_source_tagged_data(raw_data, n_energy, n_sources, source_probabilities=None):
+    """
+    Splits flux data from a tally with [mesh, energy, source tag] filters into
+    one column per source component.
+    Parameters:
+        raw_data (np.ndarray): Flattened tally data (one value per filter bin).
+        n_energy (int): Number of energy bins.
+        n_sources (int): Number of source tag bins.
+        source_probabilities (np.ndarray): Probability that a history starts in each
+            component. Dividing by it converts the scores (per particle of the combined
+            source) to flux per particle of that component, as in an individual run.
+    Returns:
+        np.ndarray: Array with dimensions (Energy, Voxels, Sources). The voxel ordering
+        matches load_tally_data(...)[e].flatten(order='F').
+    """
+    data = np.reshape(raw_data, (-1, n_energy, n_sources))
+    data = np.moveaxis(data, 1, 0)
+    if source_probabilities is not None:
+        data = data / np.asarray(source_probabilities)
+    return data
+
+def write_source_tags(run_dir, source_probabilities):
+    """
+    Records the probability that a history of a source-tagged run starts in each component.
+    """
+    with open(os.path.join(run_dir, SOURCE_TAGS_FILE), 'w') as f:
+        json.dump({'source_probabilities': [float(p) for p in source_probabilities]}, f, indent=2)
+
+def load_source_tags(run_dir):
+    """
+    Returns the per-component source probabilities written by write_source_tags.
+    """
+    with open(os.path.join(run_dir, SOURCE_TAGS_FILE)) as f:
+        return np.array(json.load(f)['source_probabilities'])
+
+def create_one_pass_matrices(statepoint_path, tally_name='cyl_tally_tagged'):
+    """
+    Assembles the individual source matrices from a single one-pass run in which every
+    history is tagged with the source component it started from.
+    The full-source flux of the same run is the untagged 'cyl_tally' (use load_tally_data).
+    Parameters:
+        statepoint_path (str): Path to the one-pass run's statepoint file.
+        tally_name (str): Name of the source-tagged tally.
+    Returns:
+        dict: Matrices (N_spatial_voxels x N_sources) with the same keys as
+        create_individual_source_matrices.
+    """
+    mean, std_dev, filters = read_tally_results(statepoint_path, tally_name)
+    n_bins = {f['type']: f['n_bins'] for f in filters}
+    n_energy = n_bins['energy']
+    n_sources = n_bins['time']
+    probabilities = load_source_tags(os.path.dirname(os.path.abspath(statepoint_path)))
+    if len(probabilities) != n_sources:
+        raise ValueError(f"{SOURCE_TAGS_FILE} lists {len(probabilities)} sources but the tally has {n_sources} source tags.")
+
+    mean_data = split_source_tagged_data(mean, n_energy, n_sources, probabilities)
+    stdev_data = split_source_tagged_data(std_dev, n_energy, n_sources, probabilities)
+
+    return {
+        'thermal_mean': mean_data[0],
+        'thermal_stdev': stdev_data[0],
+        'fast_mean': mean_data[1],
+        'fast_stdev': stdev_data[1]
+    }
+
+def get_source_number(run_dir):
+    """
+    Returns the 1-based source number of a source_XXXX run directory (name or path).
+    """
+    return int(run_dir.split('_')[-1])
+
+def load_source_columns(statepoint_path, tally_name):
+    """
+    Reads one individual-source statepoint and returns its flattened
+    (thermal_mean, thermal_stdev, fast_mean, fast_stdev) columns.
+    Top-level so it can run in a worker process.
+    """
+    # Each is a list: [Thermal_3D_array, Fast_3D_array, ...]
+    mean_data_list, stdev_data_list = load_tally_mean_std(statepoint_path, tally_name)
+
+    # Check for the required energy bins (assuming 0=Thermal, 1=Fast)
+    if len(mean_data_list) < 2:
+        raise ValueError(f"Statepoint only has {len(mean_data_list)} energy bins. Need at least 2.")
+
+    return (mean_data_list[0].flatten(order='F'),
+            stdev_data_list[0].flatten(order='F'),
+            mean_data_list[1].flatten(order='F'),
+            stdev_data_list[1].flatten(order='F'))
+
+def create_individual_source_matrices(base_dir='data/run_individual_sources_flat', tally_name='cyl_tally',
+                                      workers=1, executor='thread', out_dir=None, precision='float64',
+                                      max_rel_err=None, run_index=None):
     """
     Loads mean and standard deviation flux data from individual source simulations
     and assembles them into matrices for decomposition.
+
+    Args:
+        base_dir (str): Sweep directory (relative to the project root) holding the source_XXXX runs.
+        tally_name (str): Name of the flux tally.
+        workers (int): Number of statepoints read concurrently (1 reads them serially).
+        executor (str): 'thread' or 'process' pool for workers > 1. Threads are enough when
+            the filesystem latency dominates; processes also parallelize the decoding.
+        out_dir (str): If given, the matrices are disk-backed .npy memmaps ({key}.npy) in this
+            directory instead of in-memory arrays, for meshes too fine to hold in RAM.
+        precision (str): Storage precision, 'float64', 'float32' or 'bitround' (see precision.py).
+        max_rel_err (float): Maximum relative error of 'bitround'.
+        run_index (dict): Run index of the sweep (see run_index.load_run_index). Its complete
+            runs are used without walking the run directories.
+    Returns:
+        dict: thermal/fast mean and stdev matrices (N_spatial_voxels x N_sources, Fortran order;
+        np.memmap with out_dir), with the columns in source order, plus 'source_indices' (the
+        1-based source number of each column) and 'errors' (run directory -> error message for
+        every run that was skipped). With reduced precision, 'precision_report' holds the error
+        of each matrix against the float64 values read (see compare_precision).
     """
-    
-    thermal_mean_cols = []
-    thermal_stdev_cols = []
-    fast_mean_cols = []
-    fast_stdev_cols = []
-    
+    if executor not in ('thread', 'process'):
+        raise ValueError(f"executor must be 'thread' or 'process', not '{executor}'.")
+
     try:
         project_root = sys.path[0]
     except IndexError:
         print("ERROR: Project root not found in sys.path[0]. Did you run the setup?")
         return
-    
+
     target_dir = os.path.join(project_root, base_dir)
 
+    # --- Locate statepoints ---
+    tasks, errors = find_source_statepoints(target_dir, run_index)
+    n_runs = len(tasks) + len(errors)
+
+    # --- Preallocate (voxel count from the first readable statepoint) ---
+    n_voxels = None
+    for run_dir, sp_file in tasks:
+        try:
+            n_voxels = read_voxel_count(sp_file, tally_name)
+            break
+        except Exception as e:
+            errors[run_dir] = f"{e} (File: {sp_file})"
+    if n_voxels is None:
+        tasks, n_voxels = [], 0
+    n_columns = len(tasks)
+    dtype = get_storage_dtype(precision, max_rel_err)
+    matrices = {key: allocate_matrix((n_voxels, n_columns), key, out_dir, dtype) for key in SOURCE_MATRIX_KEYS}
+    reports = {key: None for key in SOURCE_MATRIX_KEYS}
+
+    # --- Read statepoints, writing each column in place at its source position ---
+    read_ok = np.zeros(n_columns, dtype=bool)
+
+    def store_columns(position, columns):
+        check_column_length(columns, n_voxels)
+        for key, column in zip(SOURCE_MATRIX_KEYS, columns):
+            if precision == 'float64':
+                matrices[key][:, position] = column
+            else:
+                reduced = reduce_precision(column, precision, max_rel_err)
+                reports[key] = compare_precision(column, reduced, reports[key])
+                matrices[key][:, position] = reduced
+        read_ok[position] = True
+
+    errors.update(read_source_statepoints(tasks, tally_name, store_columns, workers, executor))
+
+    if errors:
+        print(f"Warning: {len(errors)} of {n_runs} source runs could not be read (see 'errors').")
+
+    # Drop the columns of failed reads, keeping the rest in source order
+    kept = np.flatnonzero(read_ok)
+    if len(kept) < n_columns:
+        for key in SOURCE_MATRIX_KEYS:
+            matrices[key] = compact_columns(matrices[key], kept, key, out_dir)
+
+    matrices['source_indices'] = np.array([get_source_number(tasks[i][0]) for i in kept], dtype=int)
+    matrices['errors'] = errors
+    if precision != 'float64':
+        matrices['precision_report'] = {key: stats for key, stats in reports.items() if stats is not None}
+        print_precision_report(matrices['precision_report'], precision, max_rel_err)
+    return matrices
+
+def find_source_statepoints(target_dir, run_index=None, statuses=('complete',)):
+    """
+    Returns the final statepoint of every source_XXXX run in a sweep directory.
+    With a run index (see run_index.load_run_index), the runs come from the index
+    instead of a directory walk, and only runs with one of the given statuses are used.
+
+    Returns:
+        list: (run_dir, statepoint_path) pairs, in source order.
+        dict: run_dir -> error message for runs without a (usable) statepoint.
+    """
+    if run_index is not None:
+        tasks = []
+        errors = {}
+        for run_dir, entry in sorted(run_index['runs'].items(), key=lambda item: item[1]['source']):
+            if entry['status'] in statuses:
+                tasks.append((run_dir, os.path.join(target_dir, run_dir, entry['statepoint'])))
+            else:
+                reason = entry['error'] or (f"final statepoint {entry['statepoint']}"
+                                            if entry['statepoint'] else "no statepoint")
+                errors[run_dir] = f"Run is {entry['status']} ({reason})"
+        return tasks, errors
+
     # Sort the run directories numerically to ensure the columns are in order
-    run_dirs = sorted([d for d in os.listdir(target_dir) if d.startswith('source_')], 
-                      key=lambda x: int(x.split('_')[-1]))
+    run_dirs = sorted([d for d in os.listdir(target_dir) if d.startswith('source_')],
+                      key=get_source_number)
 
-    for index, run_dir in enumerate(run_dirs):
-        # NOTE: Using statepoint.100.h5 as a common placeholder
-        sp_file = os.path.join(target_dir, run_dir, "statepoint.100.h5") 
-        
-        if os.path.isfile(sp_file):
+    tasks = []
+    errors = {}
+    for run_dir in run_dirs:
+        # Use the run's final statepoint (batch counts differ when precision triggers are on)
+        sp_file = find_final_statepoint(os.path.join(target_dir, run_dir))
+        if sp_file is None:
+            errors[run_dir] = f"Statepoint not found in {os.path.join(target_dir, run_dir)}"
+        else:
+            tasks.append((run_dir, sp_file))
+    return tasks, errors
+
+def read_source_statepoints(tasks, tally_name, store_columns, workers=1, executor='thread'):
+    """
+    Reads the columns of each (run_dir, statepoint_path) task and passes them to
+    store_columns(position, columns) as they arrive, position being the task's index.
+
+    Returns:
+        dict: run_dir -> error message for every task that could not be read or stored.
+    """
+    if executor not in ('thread', 'process'):
+        raise ValueError(f"executor must be 'thread' or 'process', not '{executor}'.")
+
+    errors = {}
+    if workers > 1 and len(tasks) > 1:
+        pool_class = ThreadPoolExecutor if executor == 'thread' else ProcessPoolExecutor
+        with pool_class(max_workers=workers) as pool:
+            futures = {pool.submit(load_source_columns, sp_file, tally_name): position
+                       for position, (_, sp_file) in enumerate(tasks)}
+            for future in as_completed(futures):
+                position = futures.pop(future)
+                run_dir, sp_file = tasks[position]
+                try:
+                    store_columns(position, future.result())
+                except Exception as e:
+                    errors[run_dir] = f"{e} (File: {sp_file})"
+    else:
+        for position, (run_dir, sp_file) in enumerate(tasks):
             try:
-                # Load mean and standard deviation data separately
-                # Each is a list: [Thermal_3D_array, Fast_3D_array, ...]
-                mean_data_list = load_tally_data(sp_file, tally_name, 'mean', False)
-                stdev_data_list = load_tally_data(sp_file, tally_name, 'std_dev', False)
-                
-                # Check for the required energy bins (assuming 0=Thermal, 1=Fast)
-                if len(mean_data_list) < 2:
-                    raise ValueError(f"Statepoint in {run_dir} only has {len(mean_data_list)} energy bins. Need at least 2.")
-                
-                # --- Extract and Flatten ---
-                # thermal_mean_col = mean_data[0]
-                thermal_mean_cols.append(mean_data_list[0].flatten(order='F'))
-                thermal_stdev_cols.append(stdev_data_list[0].flatten(order='F'))
-                fast_mean_cols.append(mean_data_list[1].flatten(order='F'))
-                fast_stdev_cols.append(stdev_data_list[1].flatten(order='F'))
-            
+                store_columns(position, load_source_columns(sp_file, tally_name))
             except Exception as e:
-                print(f"Error processing {run_dir} (File: {sp_file}): {e}")
-                continue
-        else:
-            print(f"Warning: Statepoint not found at {sp_file}")
+                errors[run_dir] = f"{e} (File: {sp_file})"
+    return errors
 
+def check_column_length(columns, n_voxels):
+    """
+    Raises a ValueError if a statepoint's columns do not have n_voxels entries.
+    """
+    if len(columns[0]) != n_voxels:
+        raise ValueError(f"Statepoint has {len(columns[0])} voxels, expected {n_voxels}.")
 
-    # Assemble thermal and fast flux matrices (N_spatial_voxels x N_sources)
-    thermal_mean_matrix = np.column_stack(thermal_mean_cols) if thermal_mean_cols else np.empty((0,0))
-    thermal_stdev_matrix = np.column_stack(thermal_stdev_cols) if thermal_stdev_cols else np.empty((0,0))
-    fast_mean_matrix = np.column_stack(fast_mean_cols) if fast_mean_cols else np.empty((0,0))
-    fast_stdev_matrix = np.column_stack(fast_stdev_cols) if fast_stdev_cols else np.empty((0,0))
+def read_voxel_count(statepoint_path, tally_name='cyl_tally'):
+    """
+    Returns the number of mesh voxels of a tally, reading only the filter metadata.
+    """
+    with h5py.File(statepoint_path, 'r') as statepoint:
+        tally_group = _find_tally_group(statepoint, tally_name)
+        filters = _read_tally_filters(statepoint, tally_group)
+    for filter_info in filters:
+        if filter_info['type'] == 'mesh':
+            return int(np.prod(filter_info['dimension']))
+    raise ValueError(f"Tally '{tally_name}' in {statepoint_path} has no mesh filter.")
 
-    return {
-        'thermal_mean': thermal_mean_matrix,
-        'thermal_stdev': thermal_stdev_matrix,
-        'fast_mean': fast_mean_matrix,
-        'fast_stdev': fast_stdev_matrix
-    }
+def allocate_matrix(shape, name, out_dir=None, dtype=np.float64):
+    """
+    Returns an uninitialized matrix in column-major (Fortran) order, so each source
+    column is one contiguous block. With out_dir, the matrix is a disk-backed memmap
+    of the .npy file out_dir/{name}.npy instead of living in RAM.
+    """
+    if out_dir is None:
+        return np.empty(shape, dtype=dtype, order='F')
+    os.makedirs(out_dir, exist_ok=True)
+    return np.lib.format.open_memmap(os.path.join(out_dir, f'{name}.npy'), mode='w+',
+                                     dtype=dtype, shape=shape, fortran_order=True)
+
+def compact_columns(matrix, kept, name, out_dir=None):
+    """
+    Returns the matrix restricted to the columns in kept (sorted), moving them to the
+    front in place. A disk-backed matrix is rewritten to a .npy file of the final size.
+    """
+    for position, column in enumerate(kept):
+        if position != column:
+            matrix[:, position] = matrix[:, column]
+    if out_dir is None:
+        return matrix[:, :len(kept)]
+
+    tmp_path = os.path.join(out_dir, f'{name}.tmp.npy')
+    compacted = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=matrix.dtype,
+                                          shape=(matrix.shape[0], len(kept)), fortran_order=True)
+    compacted[:] = matrix[:, :len(kept)]
+    compacted.flush()
+    del compacted, matrix
+    final_path = os.path.join(out_dir, f'{name}.npy')
+    os.replace(tmp_path, final_path)
+    return np.load(final_path, mmap_mode='r+')
 
 def save_mesh_data_as_npz(mesh, file_path='data/analysis_npz_files', file_name='mesh_data.npz'):
     """
@@ -136,7 +476,7 @@ def save_mesh_data_as_npz(mesh, file_path='data/analysis_npz_files', file_name='
 
     os.makedirs(target_dir, exist_ok=True)
 
-    np.savez(
+    np.savez_compressed(
         f"{full_path}",
         
         # Your mesh/plotting data
@@ -173,14 +513,14 @@ def save_full_source_data_as_npz(mean_tally, stdev_tally, file_path='data/analys
 
     os.makedirs(target_dir, exist_ok=True)
 
-    np.savez(
+    np.savez_compressed(
         f"{mean_full_path}",
         
         # Your tally data
         full_source_mean=mean_tally
     )
 
-    np.savez(
+    np.savez_compressed(
         f"{stdev_full_path}",
         
         # Your tally data
@@ -218,28 +558,51 @@ def save_individual_source_matrices_as_npz(thermal_mean_matrix, fast_mean_matrix
     thermal_stdev_full_path = os.path.join(target_dir, thermal_stdev_file_name_template)
     fast_stdev_full_path = os.path.join(target_dir, fast_stdev_file_name_template)  
     os.makedirs(target_dir, exist_ok=True)
-    np.savez(
+    np.savez_compressed(
         f"{thermal_mean_full_path}",
         
         # Your tally data
         thermal_mean_matrix=thermal_mean_matrix
     )
-    np.savez(
+    np.savez_compressed(
         f"{fast_mean_full_path}",
         
         # Your tally data
         fast_mean_matrix=fast_mean_matrix
     )
-    np.savez(
+    np.savez_compressed(
         f"{thermal_stdev_full_path}",
         
         # Your tally data
         thermal_stdev_matrix=thermal_stdev_matrix
     )
-    np.savez(
+    np.savez_compressed(
         f"{fast_stdev_full_path}",
         
         # Your tally data
         fast_stdev_matrix=fast_stdev_matrix
     )
     print(f"Individual source tally data saved to {thermal_mean_full_path}, {fast_mean_full_path}, {thermal_stdev_full_path}, and {fast_stdev_full_path}")
+
+
+def find_final_statepoint(run_dir):
+    """
+    Returns the path of the statepoint with the highest batch number in run_dir,
+    or None if the run has not written a statepoint.
+    """
+    if not os.path.isdir(run_dir):
+        return None
+
+    final_batch = None
+    final_file = None
+    for file_name in os.listdir(run_dir):
+        if not (file_name.startswith('statepoint.') and file_name.endswith('.h5')):
+            continue
+        batch = file_name[len('statepoint.'):-len('.h5')]
+        if not batch.isdigit():
+            continue
+        if final_batch is None or int(batch) > final_batch:
+            final_batch = int(batch)
+            final_file = file_name
+
+    return os.path.join(run_dir, final_file) if final_file else None
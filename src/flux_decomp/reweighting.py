@@ -0,0 +1,117 @@
+import numpy as np
+
+# Every source matrix column is the flux per source particle of one component, so a
+# full-source run with strengths s_j is the strength-weighted average of the columns:
+#     flux = M @ w,   w_j = s_j / sum(s)
+# (OpenMC samples each component with probability s_j / sum(s)). The flat full-source run
+# is therefore the column average M @ ones / N, not the column sum. A profile that only
+# changes source.strength, like nonlinear vs flat, needs no transport of its own.
+# The columns come from independent runs, so their variances add:
+#     stdev = sqrt(S^2 @ w^2)
+
+def get_source_strengths(sources):
+    """
+    Returns the strength of each source component (e.g. get_nonlinear_source_components()),
+    in source order.
+    """
+    return np.array([source.strength for source in sources], dtype=float)
+
+def get_strength_weights(strengths, source_indices=None):
+    """
+    Returns the weights w_j = s_j / sum(s) of the matrix columns, and the fraction of
+    the total strength whose columns are missing from the matrix.
+
+    Args:
+        strengths (np.ndarray): (N_sources,) strengths of all source components, or an
+            (n_profiles x N_sources) batch of them.
+        source_indices (np.ndarray): 1-based source number of each matrix column
+            ('source_indices' of create_individual_source_matrices). None if the
+            columns are all the sources, in order.
+    Returns:
+        np.ndarray: Column weights (N_columns,) or (n_profiles x N_columns).
+        np.ndarray: Missing strength fraction (a scalar, or one per profile).
+    """
+    strengths = np.asarray(strengths, dtype=float)
+    total = strengths.sum(axis=-1, keepdims=True)
+    if np.any(total <= 0):
+        raise ValueError("The source strengths must have a positive sum.")
+    columns = strengths if source_indices is None else strengths[..., np.asarray(source_indices) - 1]
+    weights = columns / total
+    missing = 1.0 - weights.sum(axis=-1)
+    return weights, missing
+
+def reweight_source_flux(mean_matrix, stdev_matrix, strengths, source_indices=None):
+    """
+    Returns the flux of a source strength profile, and its std-dev, from the individual
+    source matrices of any other profile with the same source components.
+
+    Parameters:
+    -----------
+    mean_matrix, stdev_matrix : np.ndarray
+        (N_spatial_voxels x N_sources) matrices (e.g. of the flat sweep).
+    strengths : np.ndarray
+        (N_sources,) strengths of the profile, or an (n_profiles x N_sources) batch.
+    source_indices : np.ndarray
+        1-based source number of each column, if some sources are missing.
+
+    Returns:
+    --------
+    flux, stdev : np.ndarray
+        (N_spatial_voxels,) or (n_profiles x N_spatial_voxels), normalized like a
+        full-source run of the profile (per source particle). The std-dev assumes
+        independent columns (individual runs); for one-pass matrices, whose columns
+        share histories, it is approximate.
+    """
+    weights, missing = get_strength_weights(strengths, source_indices)
+    if np.any(missing > 1e-12):
+        print(f"Warning: {np.max(missing):.2%} of the source strength has no column; "
+              "the reweighted flux is biased low.")
+
+    flux = weights @ mean_matrix.T
+    # One block of columns at a time, so memmapped std-dev matrices are not squared whole
+    variance = np.zeros_like(flux)
+    step = 64
+    for start in range(0, stdev_matrix.shape[1], step):
+        block = np.asarray(stdev_matrix[:, start:start + step])
+        variance += np.square(weights[..., start:start + step]) @ np.square(block).T
+    return flux, np.sqrt(variance)
+
+def compare_with_full_run(flux, stdev, full_mean, full_stdev, label='', print_report=True):
+    """
+    Compares a reweighted flux with a full-source run of the same profile.
+
+    Both are Monte Carlo estimates, so each voxel's difference is scored against their
+    combined std-dev, z = (flux - full) / sqrt(stdev^2 + full_stdev^2). Voxels that
+    scored in neither are left out.
+
+    Returns:
+        dict: 'n_voxels', 'max_abs_z', 'frac_within_2sigma' (about 0.95 when the two
+        agree), 'reduced_chi2' (about 1 when the two agree), 'total_rel_diff' (relative
+        difference of the summed flux) and 'median_rel_diff' (median |relative
+        difference| over the scored voxels).
+    """
+    flux, stdev = np.asarray(flux), np.asarray(stdev)
+    full_mean, full_stdev = np.asarray(full_mean), np.asarray(full_stdev)
+    combined = np.sqrt(np.square(stdev) + np.square(full_stdev))
+    scored = combined > 0
+    if not np.any(scored):
+        raise ValueError("No voxel has a positive std-dev in either result.")
+
+    z = (flux[scored] - full_mean[scored]) / combined[scored]
+    nonzero = scored & (full_mean != 0)
+    rel_diff = np.abs(flux[nonzero] - full_mean[nonzero]) / np.abs(full_mean[nonzero])
+    result = {
+        'n_voxels': int(np.count_nonzero(scored)),
+        'max_abs_z': float(np.max(np.abs(z))),
+        'frac_within_2sigma': float(np.mean(np.abs(z) <= 2)),
+        'reduced_chi2': float(np.mean(np.square(z))),
+        'total_rel_diff': float((np.sum(flux) - np.sum(full_mean)) / np.sum(full_mean)),
+        'median_rel_diff': float(np.median(rel_diff)) if rel_diff.size else float('nan'),
+    }
+    if print_report:
+        print(f"Reweighted vs full-source run{' (' + label + ')' if label else ''}:")
+        print(f"  {result['n_voxels']} voxels, reduced chi2 {result['reduced_chi2']:.3f}, "
+              f"{result['frac_within_2sigma']:.1%} within 2 sigma, max |z| {result['max_abs_z']:.2f}")
+        print(f"  Total flux difference {result['total_rel_diff']:+.3e}, "
+              f"median voxel difference {result['median_rel_diff']:.3e}")
+    return result
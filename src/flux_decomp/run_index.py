@@ -0,0 +1,112 @@
+import h5py
+import os
+
+from src.flux_decomp.manifest import MANIFEST_NAME, load_manifest, save_manifest
+from src.flux_decomp.processing import find_final_statepoint, get_source_number
+
+RUN_INDEX_NAME = 'run_index.json'
+
+def read_statepoint_header(statepoint_path):
+    """
+    Returns the batch/particle counts of a statepoint ('current_batch', 'n_batches',
+    'n_particles', 'n_realizations'; None when a value is not in the file).
+    """
+    header = {}
+    with h5py.File(statepoint_path, 'r') as statepoint:
+        for name in ('current_batch', 'n_batches', 'n_particles', 'n_realizations'):
+            header[name] = int(statepoint[name][()]) if name in statepoint else None
+    return header
+
+def get_run_status(header, manifest_entry=None, statepoint_name=None):
+    """
+    Returns the completion status of a run from its final statepoint header and
+    its sweep manifest entry:
+        complete - all batches ran, or the run stopped early on its precision trigger
+                   (recorded as complete in the manifest with this statepoint)
+        failed   - the manifest records a failure
+        partial  - the statepoint stops before the last batch (e.g. an interrupted run)
+        missing  - no statepoint
+    """
+    if manifest_entry is not None and manifest_entry.get('status') == 'failed':
+        return 'failed'
+    if header is None:
+        return 'missing'
+    if (manifest_entry is not None and manifest_entry.get('status') == 'complete'
+            and manifest_entry.get('statepoint') == statepoint_name):
+        return 'complete'
+    if header['current_batch'] is not None and header['n_batches'] is not None:
+        return 'complete' if header['current_batch'] >= header['n_batches'] else 'partial'
+    return 'complete'
+
+def _scan_run(target_dir, run_name, manifest_entry, cached_entry):
+    """
+    Returns the index entry of one run, reusing the cached entry when the final
+    statepoint is unchanged (same name, size and mtime).
+    """
+    run_dir = os.path.join(target_dir, run_name)
+    sp_file = find_final_statepoint(run_dir)
+    entry = {'run': run_name, 'source': get_source_number(run_name), 'statepoint': None,
+             'size': None, 'mtime_ns': None, 'current_batch': None, 'n_batches': None,
+             'n_particles': None, 'n_realizations': None, 'status': None, 'error': None}
+
+    header = None
+    if sp_file is not None:
+        stat = os.stat(sp_file)
+        entry.update({'statepoint': os.path.basename(sp_file), 'size': stat.st_size,
+                      'mtime_ns': stat.st_mtime_ns})
+        unchanged = (cached_entry is not None
+                     and all(cached_entry.get(k) == entry[k] for k in ('statepoint', 'size', 'mtime_ns'))
+                     and cached_entry.get('error') is None)
+        try:
+            if unchanged:
+                header = {k: cached_entry[k] for k in ('current_batch', 'n_batches', 'n_particles', 'n_realizations')}
+            else:
+                header = read_statepoint_header(sp_file)
+            entry.update(header)
+        except Exception as e:
+            entry['error'] = str(e)
+            entry['status'] = 'unreadable'
+            return entry
+
+    entry['status'] = get_run_status(header, manifest_entry, entry['statepoint'])
+    if manifest_entry is not None and manifest_entry.get('error'):
+        entry['error'] = manifest_entry['error']
+    return entry
+
+def build_run_index(target_dir, cached_index=None):
+    """
+    Scans a sweep directory and returns its run index: for every source_XXXX run, the
+    final statepoint (name, size, mtime), its batch and particle counts, and the run's
+    completion status (see get_run_status). Statepoints unchanged since cached_index
+    are not reopened.
+    """
+    manifest = load_manifest(os.path.join(target_dir, MANIFEST_NAME))
+    cached_runs = (cached_index or {}).get('runs', {})
+
+    run_names = sorted([d for d in os.listdir(target_dir) if d.startswith('source_')
+                        and os.path.isdir(os.path.join(target_dir, d))],
+                       key=get_source_number)
+    runs = {name: _scan_run(target_dir, name, manifest.get(name), cached_runs.get(name))
+            for name in run_names}
+
+    counts = {}
+    for entry in runs.values():
+        counts[entry['status']] = counts.get(entry['status'], 0) + 1
+    return {'target_dir': os.path.abspath(target_dir), 'counts': counts, 'runs': runs}
+
+def load_run_index(target_dir, refresh=False):
+    """
+    Returns the run index of a sweep, cached in target_dir/run_index.json. The cached
+    index is returned as is (no directory walk, no file probing) unless refresh is
+    True or there is no cache yet; a refresh only reopens changed statepoints.
+    """
+    index_path = os.path.join(target_dir, RUN_INDEX_NAME)
+    cached_index = load_manifest(index_path)
+    if cached_index and not refresh:
+        return cached_index
+
+    index = build_run_index(target_dir, cached_index)
+    save_manifest(index, index_path)
+    summary = ', '.join(f"{n} {status}" for status, n in sorted(index['counts'].items()))
+    print(f"Run index of {target_dir}: {len(index['runs'])} runs ({summary or 'none'}).")
+    return index
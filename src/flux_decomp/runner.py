@@ -0,0 +1,308 @@
+import openmc
+import numpy as np
+import contextlib
+import copy
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from src.flux_decomp.driver import run_source_in_process
+from src.flux_decomp.inputs import (
+    get_base_settings,
+    get_flux_tallies,
+    tag_source_components
+)
+from src.flux_decomp.processing import write_source_tags
+from src.flux_decomp.manifest import (
+    MANIFEST_NAME,
+    compute_input_hash,
+    is_run_current,
+    load_manifest,
+    record_run,
+    save_manifest
+)
+
+# --- Run Directory Layout ---
+def get_manifest_path(base_run_dir):
+    """
+    Returns the path of the run manifest kept alongside a sweep's run directories.
+    Every run is recorded in the manifest of the directory that contains it.
+    """
+    return os.path.join(base_run_dir, MANIFEST_NAME)
+
+def get_run_name(index):
+    """
+    Returns the run directory name for the (0-based) source index,
+    e.g. index 0 -> "source_0001".
+    """
+    return f"source_{index+1:04d}"
+
+# Model files that are identical for every individual source run
+SHARED_MODEL_FILES = ('geometry.xml', 'materials.xml', 'tallies.xml')
+
+def export_shared_model(geometry, materials, tallies, shared_dir):
+    """
+    Writes the model files shared by every run (geometry, materials, tallies) once.
+
+    Args:
+        geometry (openmc.Geometry): The shared model geometry.
+        materials (openmc.Materials): The shared model materials.
+        tallies (openmc.Tallies): The shared model tallies.
+        shared_dir (str): Directory to write geometry.xml, materials.xml and tallies.xml to.
+    """
+    os.makedirs(shared_dir, exist_ok=True)
+    # The lattice-heavy geometry.xml is the largest file; it is serialized exactly once here
+    geometry.export_to_xml(os.path.join(shared_dir, 'geometry.xml'))
+    materials.export_to_xml(os.path.join(shared_dir, 'materials.xml'))
+    tallies.export_to_xml(os.path.join(shared_dir, 'tallies.xml'))
+
+def _link_shared_file(shared_path, run_path):
+    """
+    Points run_path at shared_path with a relative symlink, falling back to a copy
+    on filesystems without symlink support.
+    """
+    if os.path.islink(run_path):
+        if os.path.realpath(run_path) == os.path.realpath(shared_path):
+            return
+        os.remove(run_path)
+    elif os.path.exists(run_path):
+        os.remove(run_path)
+
+    try:
+        os.symlink(os.path.relpath(shared_path, os.path.dirname(run_path)), run_path)
+    except OSError:
+        shutil.copyfile(shared_path, run_path)
+
+def export_individual_source_runs(geometry, materials, tallies, sources, base_run_dir, shared_dir=None,
+                                  settings=None, particles=None, indices=None):
+    """
+    Writes the XML inputs for every individual source run.
+
+    If shared_dir is given, geometry.xml, materials.xml and tallies.xml are written there
+    once and linked into each run directory, so only settings.xml (which holds the source)
+    is written per run.
+
+    Args:
+        geometry (openmc.Geometry): The shared model geometry.
+        materials (openmc.Materials): The shared model materials.
+        tallies (openmc.Tallies): The shared model tallies.
+        sources (list): Individual source components, one run per entry.
+        base_run_dir (str): Directory that will hold the source_XXXX run directories.
+        shared_dir (str): Directory for the shared model files (None exports the full
+            model into every run directory).
+        settings (openmc.Settings): Settings template copied for every run, e.g. with
+            precision triggers applied (defaults to get_base_settings()).
+        particles (list): Optional particles per batch for each source, in source order
+            (e.g. from load_particle_plan). Overrides the template's particles.
+        indices (list): Optional 0-based source indices to export (a subset of the sweep).
+            Run directories keep the numbering of the full source list.
+
+    Returns:
+        list: The run directories, in source order.
+    """
+    if shared_dir is not None:
+        export_shared_model(geometry, materials, tallies, shared_dir)
+
+    if indices is None:
+        indices = range(len(sources))
+
+    run_dirs = []
+    for i in indices:
+        single_source = sources[i]
+        run_dir = os.path.join(base_run_dir, get_run_name(i))
+        os.makedirs(run_dir, exist_ok=True)
+
+        # Get a fresh copy of base settings and assign only ONE source
+        run_settings = get_base_settings() if settings is None else copy.deepcopy(settings)
+        run_settings.source = single_source
+        if particles is not None:
+            run_settings.particles = int(particles[i])
+
+        if shared_dir is not None:
+            run_settings.export_to_xml(os.path.join(run_dir, 'settings.xml'))
+            for file_name in SHARED_MODEL_FILES:
+                _link_shared_file(os.path.join(shared_dir, file_name),
+                                  os.path.join(run_dir, file_name))
+        else:
+            model = openmc.model.Model(
+                geometry=geometry,
+                materials=materials,
+                settings=run_settings,
+                tallies=tallies
+            )
+            model.export_to_xml(directory=run_dir)
+        run_dirs.append(run_dir)
+
+    return run_dirs
+
+def export_one_pass_run(geometry, materials, sources, run_dir, settings=None, particles_per_source=None):
+    """
+    Writes the XML inputs for a one-pass decomposition run: the combined source list is
+    run once, with every history tagged by the component it starts from
+    (see tag_source_components).
+
+    The run scores the usual untagged 'cyl_tally', which is the full-source flux, and a
+    'cyl_tally_tagged' copy with one source tag bin per component. That copy yields every
+    column of the flux matrix (see create_one_pass_matrices).
+
+    Args:
+        geometry (openmc.Geometry): The model geometry.
+        materials (openmc.Materials): The model materials.
+        sources (list): Source components (left unmodified; their strengths are kept).
+        run_dir (str): Directory for the run.
+        settings (openmc.Settings): Settings template (defaults to get_base_settings()).
+        particles_per_source (int): If given, particles per batch are set to
+            particles_per_source x number of components.
+
+    Returns:
+        str: The run directory.
+    """
+    n_sources = len(sources)
+    tagged_sources = tag_source_components([copy.deepcopy(source) for source in sources])
+    strengths = np.array([source.strength for source in sources], dtype=float)
+
+    run_settings = get_base_settings() if settings is None else copy.deepcopy(settings)
+    run_settings.source = tagged_sources
+    if particles_per_source is not None:
+        run_settings.particles = particles_per_source * n_sources
+
+    tallies = get_flux_tallies()
+    tagged_tally = get_flux_tallies(n_source_tags=n_sources)[0]
+    tagged_tally.name = 'cyl_tally_tagged'
+    tallies.append(tagged_tally)
+
+    os.makedirs(run_dir, exist_ok=True)
+    model = openmc.model.Model(
+        geometry=geometry,
+        materials=materials,
+        settings=run_settings,
+        tallies=tallies
+    )
+    model.export_to_xml(directory=run_dir)
+    write_source_tags(run_dir, strengths / strengths.sum())
+
+    return run_dir
+
+# --- Parallel Execution ---
+def get_threads_per_run(jobs, total_threads=None):
+    """
+    Splits the node's OpenMP thread budget evenly across concurrent runs.
+
+    Args:
+        jobs (int): Number of OpenMC runs executing at the same time.
+        total_threads (int): Threads available on the node (defaults to os.cpu_count()).
+
+    Returns:
+        int: OpenMP threads to give each run (at least 1).
+    """
+    if total_threads is None:
+        total_threads = os.cpu_count() or 1
+    return max(1, total_threads // max(1, jobs))
+
+def run_single_source(run_dir, threads=None, log_name='openmc.log', in_process=False):
+    """
+    Runs OpenMC inside run_dir and writes its output to a per-run log file.
+    This is the unit of work executed by each worker process.
+
+    Args:
+        run_dir (str): Directory holding the run's XML inputs.
+        threads (int): OpenMP threads for this run.
+        log_name (str): Name of the log file written inside run_dir.
+        in_process (bool): Run through openmc.lib in this process instead of the
+            openmc executable (see run_source_in_process).
+
+    Returns:
+        str: The run directory (so callers can match results to runs).
+    """
+    # Remove statepoints from an earlier attempt so the final statepoint is unambiguous
+    for file_name in os.listdir(run_dir):
+        if file_name.startswith('statepoint.') and file_name.endswith('.h5'):
+            os.remove(os.path.join(run_dir, file_name))
+
+    log_path = os.path.join(run_dir, log_name)
+    if in_process:
+        return run_source_in_process(run_dir, threads, log_path)
+    with open(log_path, 'w') as log_file, contextlib.redirect_stdout(log_file):
+        openmc.run(cwd=run_dir, threads=threads, output=True)
+    return run_dir
+
+def run_sources_parallel(run_dirs, jobs=1, total_threads=None, log_name='openmc.log', resume=False,
+                         in_process=False):
+    """
+    Runs OpenMC in every run directory using a local process pool.
+    A failed run is recorded and reported; it does not stop the rest of the sweep.
+    Runs are started in the order given, so long runs (e.g. the full source) should come first.
+
+    If resume is True, each run is tracked in the manifest of its parent directory
+    (see get_manifest_path): runs that already completed with identical inputs (same hash
+    of their XML files) are skipped, and the outcome of every run is written to the
+    manifest as soon as it finishes.
+
+    Args:
+        run_dirs (list): Run directories with exported XML inputs.
+        jobs (int): Number of runs to execute at once.
+        total_threads (int): Threads available on the node (defaults to os.cpu_count()).
+        log_name (str): Name of the per-run log file.
+        resume (bool): Skip up-to-date runs and record outcomes in the manifests.
+        in_process (bool): Each worker process runs its sources through openmc.lib
+            instead of launching the openmc executable once per source.
+
+    Returns:
+        dict: {'completed': [run_dir, ...], 'failed': {run_dir: error_message},
+               'skipped': [run_dir, ...]}
+    """
+    skipped = []
+    manifests = {}
+    if resume:
+        file_cache = {}
+        input_hashes = {run_dir: compute_input_hash(run_dir, file_cache=file_cache) for run_dir in run_dirs}
+        for run_dir in run_dirs:
+            manifest_path = get_manifest_path(os.path.dirname(run_dir))
+            if manifest_path not in manifests:
+                manifests[manifest_path] = load_manifest(manifest_path)
+        current = {
+            d for d in run_dirs
+            if is_run_current(manifests[get_manifest_path(os.path.dirname(d))], d, input_hashes[d])
+        }
+        skipped = [d for d in run_dirs if d in current]
+        run_dirs = [d for d in run_dirs if d not in current]
+        if skipped:
+            print(f"Skipping {len(skipped)} runs that are complete and up to date.")
+
+    threads = get_threads_per_run(jobs, total_threads)
+    print(f"Running {len(run_dirs)} simulations with {jobs} concurrent jobs "
+          f"x {threads} threads each.")
+
+    completed = []
+    failed = {}
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {
+            executor.submit(run_single_source, run_dir, threads, log_name, in_process): run_dir
+            for run_dir in run_dirs
+        }
+        for future in as_completed(futures):
+            run_dir = futures[future]
+            run_name = os.path.basename(run_dir)
+            manifest_path = get_manifest_path(os.path.dirname(run_dir))
+            try:
+                future.result()
+                completed.append(run_dir)
+                print(f"Simulation complete for {run_name} "
+                      f"({len(completed) + len(failed)}/{len(run_dirs)}).")
+                if resume:
+                    record_run(manifests[manifest_path], run_dir, input_hashes[run_dir], 'complete')
+            except Exception as e:
+                failed[run_dir] = str(e)
+                print(f"Error running {run_name} (log: {os.path.join(run_dir, log_name)}): {e}")
+                if resume:
+                    record_run(manifests[manifest_path], run_dir, input_hashes[run_dir], 'failed', error=str(e))
+            if resume:
+                save_manifest(manifests[manifest_path], manifest_path)
+
+    completed.sort()
+    if failed:
+        print(f"{len(failed)} of {len(run_dirs)} simulations failed:")
+        for run_dir in sorted(failed):
+            print(f"  {os.path.basename(run_dir)}")
+
+    return {'completed': completed, 'failed': failed, 'skipped': skipped}
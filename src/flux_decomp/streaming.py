@@ -0,0 +1,187 @@
+import numpy as np
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from src.flux_decomp.processing import (
+    SOURCE_MATRIX_KEYS,
+    find_source_statepoints,
+    get_source_number,
+    load_source_columns
+)
+
+def _iter_loaded_columns(tasks, tally_name, workers, executor):
+    """
+    Yields (task, columns or exception) in task order. With workers > 1, at most
+    2*workers statepoints are read ahead, so memory stays bounded.
+    """
+    if workers <= 1:
+        for task in tasks:
+            try:
+                yield task, load_source_columns(task[1], tally_name)
+            except Exception as e:
+                yield task, e
+        return
+
+    pool_class = ThreadPoolExecutor if executor == 'thread' else ProcessPoolExecutor
+    with pool_class(max_workers=workers) as pool:
+        pending = deque()
+        task_iter = iter(tasks)
+        for task in task_iter:
+            pending.append((task, pool.submit(load_source_columns, task[1], tally_name)))
+            if len(pending) >= 2 * workers:
+                break
+        while pending:
+            task, future = pending.popleft()
+            try:
+                result = future.result()
+            except Exception as e:
+                result = e
+            next_task = next(task_iter, None)
+            if next_task is not None:
+                pending.append((next_task, pool.submit(load_source_columns, next_task[1], tally_name)))
+            yield task, result
+
+def iter_source_columns(target_dir, tally_name='cyl_tally', block_size=1, keys=SOURCE_MATRIX_KEYS,
+                        workers=1, executor='thread', errors=None, run_index=None):
+    """
+    Streams the individual source matrices column block by column block, straight from
+    the statepoints, without ever holding the full matrices.
+
+    Args:
+        target_dir (str): Sweep directory holding the source_XXXX runs.
+        tally_name (str): Name of the flux tally.
+        block_size (int): Sources per yielded block.
+        keys (tuple): Matrices to stream (subset of SOURCE_MATRIX_KEYS).
+        workers (int): Number of statepoints read concurrently (read-ahead is bounded).
+        executor (str): 'thread' or 'process' pool for workers > 1.
+        errors (dict): If given, filled with run_dir -> error message for every run that
+            was skipped.
+        run_index (dict): Run index of the sweep; only its complete runs are streamed.
+    Yields:
+        np.ndarray: The 1-based source numbers of the block's columns.
+        dict: key -> (N_spatial_voxels x block) Fortran-order block, the same columns
+        (flatten(order='F') voxel order) as create_individual_source_matrices.
+    """
+    if executor not in ('thread', 'process'):
+        raise ValueError(f"executor must be 'thread' or 'process', not '{executor}'.")
+    tasks, missing = find_source_statepoints(target_dir, run_index)
+    if errors is not None:
+        errors.update(missing)
+
+    key_positions = [SOURCE_MATRIX_KEYS.index(key) for key in keys]
+    block_sources = []
+    block_columns = []
+    for (run_dir, sp_file), columns in _iter_loaded_columns(tasks, tally_name, workers, executor):
+        if isinstance(columns, Exception):
+            if errors is not None:
+                errors[run_dir] = f"{columns} (File: {sp_file})"
+            continue
+        block_sources.append(get_source_number(run_dir))
+        block_columns.append([columns[p] for p in key_positions])
+        if len(block_sources) == block_size:
+            yield _make_block(block_sources, block_columns, keys)
+            block_sources, block_columns = [], []
+    if block_sources:
+        yield _make_block(block_sources, block_columns, keys)
+
+def _make_block(block_sources, block_columns, keys):
+    """
+    Stacks buffered columns into Fortran-order blocks.
+    """
+    blocks = {}
+    for k, key in enumerate(keys):
+        block = np.empty((len(block_columns[0][k]), len(block_sources)), order='F')
+        for j, columns in enumerate(block_columns):
+            block[:, j] = columns[k]
+        blocks[key] = block
+    return np.array(block_sources, dtype=int), blocks
+
+# --- Reducers ---
+# Each reducer consumes (source_indices, blocks) pairs with update() and exposes its
+# result; consume_stream feeds one pass of the stream to several reducers at once.
+
+class RunningSum:
+    """
+    Accumulates M @ weights for one matrix (all ones by default). weights maps a source
+    number to its weight (dict or callable). The columns are per source particle, so a
+    full-source run is M @ (s / sum(s)): with the default weights, divide the result by
+    n_sources to get the flat full-source flux.
+    """
+
+    def __init__(self, key, weights=None):
+        self.key = key
+        self.weights = weights
+        self.result = None
+        self.n_sources = 0
+
+    def _weights(self, source_indices):
+        if self.weights is None:
+            return np.ones(len(source_indices))
+        if callable(self.weights):
+            return np.array([self.weights(s) for s in source_indices], dtype=float)
+        return np.array([self.weights[s] for s in source_indices], dtype=float)
+
+    def update(self, source_indices, blocks):
+        partial = blocks[self.key] @ self._weights(source_indices)
+        self.result = partial if self.result is None else self.result + partial
+        self.n_sources += len(source_indices)
+
+class GramAccumulator:
+    """
+    Accumulates the voxel-space Gram matrix M @ M.T (N_spatial_voxels x N_spatial_voxels)
+    of one matrix. Its eigenvectors are the left singular vectors of M and its
+    eigenvalues the squared singular values, whatever the number of sources.
+    Optionally restricted to a contiguous voxel range (e.g. one z-plane).
+    """
+
+    def __init__(self, key, voxels=None):
+        self.key = key
+        self.voxels = voxels if voxels is not None else slice(None)
+        self.result = None
+        self.n_sources = 0
+
+    def update(self, source_indices, blocks):
+        block = blocks[self.key][self.voxels]
+        partial = block @ block.T
+        self.result = partial if self.result is None else self.result + partial
+        self.n_sources += len(source_indices)
+
+class RangeSketch:
+    """
+    Accumulates a randomized range sketch Y = M @ Omega (N_spatial_voxels x n_columns)
+    of one matrix. Each source's row of the Gaussian test matrix Omega is drawn from a
+    generator seeded with (seed, source number), so the sketch does not depend on the
+    block size or read order. orthonormal_basis() returns Q, whose span approximates
+    the range of M (the first pass of a randomized SVD).
+    """
+
+    def __init__(self, key, n_columns, seed=0):
+        self.key = key
+        self.n_columns = n_columns
+        self.seed = seed
+        self.result = None
+
+    def test_matrix_rows(self, source_indices):
+        """Rows of Omega for the given source numbers."""
+        return np.vstack([np.random.default_rng([self.seed, int(s)]).standard_normal(self.n_columns)
+                          for s in source_indices])
+
+    def update(self, source_indices, blocks):
+        partial = blocks[self.key] @ self.test_matrix_rows(source_indices)
+        self.result = partial if self.result is None else self.result + partial
+
+    def orthonormal_basis(self):
+        q, _ = np.linalg.qr(self.result)
+        return q
+
+def consume_stream(stream, *reducers):
+    """
+    Feeds every block of a column stream to each reducer (a single pass over the
+    statepoints) and returns the source numbers seen, in stream order.
+    """
+    seen = []
+    for source_indices, blocks in stream:
+        for reducer in reducers:
+            reducer.update(source_indices, blocks)
+        seen.extend(int(s) for s in source_indices)
+    return np.array(seen, dtype=int)
@@ -0,0 +1,151 @@
+import numpy as np
+import h5py
+import os
+
+from src.flux_decomp.decomposition import truncated_svd
+from src.flux_decomp.flux_store import ENERGY_GROUPS
+from src.flux_decomp.reweighting import get_strength_weights
+
+SURROGATE_FILE = 'flux_surrogate.h5'
+
+class FluxSurrogate:
+    """
+    Low-rank model of the source flux matrices: for each energy group, the truncated
+    factors U (N_spatial_voxels x k), s (k) and Vt (k x N_sources) of its mean matrix,
+    plus the mesh volumes (nr x nphi x nz) and the source number of each column.
+
+    The flux of a source-strength profile with column weights w = s_j / sum(s) (see
+    get_strength_weights) is U (s * (Vt w)), which costs
+    O(k * (N_sources + N_spatial_voxels)) instead of O(N_spatial_voxels * N_sources)
+    for M w. evaluate() does this for a whole batch of strength vectors at once.
+    Voxels are in the source-matrix column order (mesh-bin order, r fastest), so the
+    results plot with plot_phir_slice like the columns themselves.
+    """
+
+    def __init__(self, factors, volumes, source_indices=None, info=None):
+        self.factors = {group: tuple(np.asarray(f) for f in factor) for group, factor in factors.items()}
+        self.volumes = np.asarray(volumes)
+        n_sources = next(iter(self.factors.values()))[2].shape[1]
+        self.source_indices = (np.asarray(source_indices, dtype=int) if source_indices is not None
+                               else np.arange(1, n_sources + 1))
+        self.info = info or {}
+
+    @classmethod
+    def from_matrices(cls, matrices, volumes, rank=10, energy=None, method='randomized',
+                      groups=ENERGY_GROUPS, source_indices=None):
+        """
+        Builds the surrogate from the '{group}_mean' matrices of
+        create_individual_source_matrices (or load_flux_store), truncating each with
+        truncated_svd to the given rank or energy fraction.
+        """
+        factors = {}
+        info = {}
+        for group in groups:
+            u, s, vt, info[group] = truncated_svd(matrices[f'{group}_mean'], rank=None if energy else rank,
+                                                  energy=energy, method=method)
+            factors[group] = (u, s, vt)
+            print(f"{group}: rank {info[group]['rank']}, relative error {info[group]['relative_error']:.2e}")
+        if source_indices is None:
+            source_indices = matrices.get('source_indices')
+        return cls(factors, volumes, source_indices, info)
+
+    @property
+    def groups(self):
+        return tuple(self.factors)
+
+    @property
+    def n_sources(self):
+        return len(self.source_indices)
+
+    @property
+    def voxels_per_z(self):
+        nr, nphi, _ = self.volumes.shape
+        return nr * nphi
+
+    def rank(self, group):
+        return len(self.factors[group][1])
+
+    def evaluate(self, strengths, group='thermal', normalize_volume=False, z=None):
+        """
+        Returns the flux for one or many source-strength vectors, normalized like a
+        full-source run of each profile (per source particle, as reweight_source_flux).
+
+        Parameters:
+        -----------
+        strengths : np.ndarray
+            (N_sources,) strengths of all source components, or an (n_vectors x N_sources)
+            batch of them. A unit vector gives the flux of that source alone.
+        group : str
+            Energy group.
+        normalize_volume : bool
+            Divide by the mesh element volumes (flux per unit volume).
+        z : int
+            Only return the voxels of this z-plane (N_r * N_phi values).
+
+        Returns:
+        --------
+        np.ndarray
+            (N_voxels,) flux, or (n_vectors x N_voxels) for a batch.
+        """
+        u, s, vt = self.factors[group]
+        strengths = np.asarray(strengths, dtype=float)
+        if strengths.shape[-1] < self.source_indices.max():
+            raise ValueError(f"Expected {self.source_indices.max()} source strengths, got {strengths.shape[-1]}.")
+        weights, missing = get_strength_weights(strengths, self.source_indices)
+        if np.any(missing > 1e-12):
+            print(f"Warning: {np.max(missing):.2%} of the source strength has no column; "
+                  "the surrogate flux is biased low.")
+
+        voxels = slice(None)
+        if z is not None:
+            n_z = self.volumes.shape[2]
+            if not 0 <= z < n_z:
+                raise IndexError(f"z-plane {z} is out of range for {n_z} planes.")
+            voxels = slice(z * self.voxels_per_z, (z + 1) * self.voxels_per_z)
+
+        # (n x S) @ (S x k) -> (n x k), then (n x k) @ (k x V)
+        coefficients = (weights @ vt.T) * s
+        flux = coefficients @ u[voxels].T
+        if normalize_volume:
+            volumes = self.volumes.flatten(order='F')[voxels]
+            flux = np.divide(flux, volumes, out=np.zeros_like(flux), where=volumes != 0)
+        return flux
+
+    def save(self, path):
+        """
+        Writes the surrogate to an HDF5 file: /volumes, /source_indices and
+        /groups/{group}/{U,s,Vt}, with the truncation info as group attributes.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with h5py.File(path, 'w') as f:
+            f.create_dataset('volumes', data=self.volumes)
+            f.create_dataset('source_indices', data=self.source_indices)
+            groups = f.create_group('groups')
+            for group, (u, s, vt) in self.factors.items():
+                g = groups.create_group(group)
+                g.create_dataset('U', data=u)
+                g.create_dataset('s', data=s)
+                g.create_dataset('Vt', data=vt)
+                for name, value in self.info.get(group, {}).items():
+                    g.attrs[name] = value
+        print(f"Flux surrogate saved to {path}")
+        return path
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a surrogate written by save().
+        """
+        with h5py.File(path, 'r') as f:
+            volumes = f['volumes'][()]
+            source_indices = f['source_indices'][()]
+            factors = {}
+            info = {}
+            # HDF5 lists groups alphabetically; restore the energy filter order
+            order = {group: i for i, group in enumerate(ENERGY_GROUPS)}
+            for group in sorted(f['groups'], key=lambda g: order.get(g, len(order))):
+                g = f['groups'][group]
+                factors[group] = (g['U'][()], g['s'][()], g['Vt'][()])
+                info[group] = {name: (value.item() if isinstance(value, np.generic) else value)
+                               for name, value in g.attrs.items()}
+        return cls(factors, volumes, source_indices, info)
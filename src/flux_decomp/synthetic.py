@@ -0,0 +1,176 @@
+import numpy as np
+import h5py
+import os
+
+from src.flux_decomp.inputs import get_flux_mesh_grids
+
+# Filter layout of cyl_tally: CylindricalMesh (r, phi, z) and a thermal/fast EnergyFilter
+CYL_TALLY_DIMENSION = (40, 95, 3)
+CYL_TALLY_ENERGY_EDGES = (0.0, 0.625, 20.0e6)
+
+def _get_mesh_grids(mesh_dimension):
+    """
+    Returns (r_grid, phi_grid, z_grid) for a mesh dimension, the flux tally grids when
+    the dimension matches cyl_tally.
+    """
+    if tuple(mesh_dimension) == CYL_TALLY_DIMENSION:
+        return get_flux_mesh_grids()
+    nr, nphi, nz = mesh_dimension
+    return (np.linspace(0, 129.8, nr + 1),
+            np.linspace(0, 2*np.pi, nphi + 1),
+            np.linspace(-10, 10, nz + 1))
+
+def get_synthetic_flux(mesh_dimension, n_groups, source_number, n_modes=4, seed=0):
+    """
+    Returns a smooth, low-rank flux field (n_groups x N_spatial_voxels, mesh-bin order
+    with r fastest) for one synthetic source: a few fixed spatial modes weighted by
+    source-dependent coefficients, so decompositions behave like on real sweeps.
+    """
+    nr, nphi, nz = mesh_dimension
+    r = (np.arange(nr) + 0.5) / nr
+    phi = (np.arange(nphi) + 0.5) / nphi * 2*np.pi
+    z = (np.arange(nz) + 0.5) / nz
+    r_mesh = np.broadcast_to(r[:, None, None], (nr, nphi, nz))
+    phi_mesh = np.broadcast_to(phi[None, :, None], (nr, nphi, nz))
+    z_mesh = np.broadcast_to(z[None, None, :], (nr, nphi, nz))
+
+    rng = np.random.default_rng([seed, source_number])
+    flux = np.empty((n_groups, nr * nphi * nz))
+    for g in range(n_groups):
+        field = np.zeros((nr, nphi, nz))
+        for mode in range(n_modes):
+            shape = (np.exp(-(mode + 1 + g) * r_mesh)
+                     * (1 + 0.5*np.cos((mode + 1) * phi_mesh))
+                     * (1 + 0.2*np.sin(np.pi * z_mesh)))
+            field += abs(rng.normal(1.0, 0.5)) / (mode + 1)**2 * shape
+        # Mesh-bin order: r fastest, z slowest
+        flux[g] = field.flatten(order='F')
+    return flux
+
+def write_synthetic_statepoint(path, mesh_dimension=CYL_TALLY_DIMENSION, energy_edges=CYL_TALLY_ENERGY_EDGES,
+                               n_realizations=100, rel_err=0.02, tally_name='cyl_tally', source_number=1,
+                               seed=0):
+    """
+    Writes a statepoint-shaped HDF5 file holding one mesh x energy flux tally with the
+    filter layout of cyl_tally (no transport, no cross sections). It carries what the
+    h5py readers in processing.py use: the tally results (sum, sum of squares), the
+    filters and the mesh. It is not a complete OpenMC statepoint.
+
+    Parameters:
+    -----------
+    path : str
+        File to write.
+    mesh_dimension : tuple
+        (nr, nphi, nz) of the cylindrical mesh.
+    energy_edges : tuple
+        Energy group edges (eV).
+    n_realizations : int
+        Number of batches the accumulated sums correspond to.
+    rel_err : float
+        Relative standard deviation of the mean of every bin.
+    source_number : int
+        Seeds the source's flux shape (see get_synthetic_flux).
+    """
+    n_groups = len(energy_edges) - 1
+    mean = get_synthetic_flux(mesh_dimension, n_groups, source_number, seed=seed)
+    return _write_tally_statepoint(path, mean, rel_err * mean, mesh_dimension, energy_edges,
+                                   n_realizations, tally_name)
+
+def write_synthetic_full_source_statepoint(path, n_sources, strengths=None, mesh_dimension=CYL_TALLY_DIMENSION,
+                                           energy_edges=CYL_TALLY_ENERGY_EDGES, n_realizations=100,
+                                           rel_err=0.02, tally_name='cyl_tally', seed=0, noise_seed=1):
+    """
+    Writes the full-source statepoint matching write_synthetic_sweep: every source
+    sampled with probability s_j / sum(s), so its flux is the strength-weighted average
+    of the synthetic sources' fluxes (OpenMC tallies are per source particle). Unlike
+    the sweep's statepoints, the mean carries Gaussian noise of its std-dev (rel_err),
+    like a real run.
+
+    Parameters:
+    -----------
+    n_sources : int
+        Number of sources of the sweep.
+    strengths : np.ndarray
+        (n_sources,) source strengths; flat if None.
+    noise_seed : int
+        Seeds the noise of the mean.
+    """
+    n_groups = len(energy_edges) - 1
+    strengths = np.ones(n_sources) if strengths is None else np.asarray(strengths, dtype=float)
+    probabilities = strengths / strengths.sum()
+    expected = sum(p * get_synthetic_flux(mesh_dimension, n_groups, j + 1, seed=seed)
+                   for j, p in enumerate(probabilities))
+    std_dev = rel_err * expected
+    mean = expected + std_dev * np.random.default_rng(noise_seed).standard_normal(expected.shape)
+    return _write_tally_statepoint(path, mean, std_dev, mesh_dimension, energy_edges,
+                                   n_realizations, tally_name)
+
+def _write_tally_statepoint(path, mean, std_dev, mesh_dimension, energy_edges, n_realizations, tally_name):
+    """
+    Writes the statepoint of write_synthetic_statepoint for a given mean and std-dev
+    (n_groups x N_spatial_voxels, mesh-bin order).
+    """
+    n_groups = len(energy_edges) - 1
+    n_mesh = int(np.prod(mesh_dimension))
+    # Bin order: mesh filter outer, energy filter inner
+    mean = mean.T.reshape(n_mesh * n_groups)
+    std_dev = std_dev.T.reshape(n_mesh * n_groups)
+    sum_ = mean * n_realizations
+    sum_sq = n_realizations * (mean**2 + (n_realizations - 1) * std_dev**2)
+    r_grid, phi_grid, z_grid = _get_mesh_grids(mesh_dimension)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with h5py.File(path, 'w') as statepoint:
+        statepoint.attrs['filetype'] = np.bytes_('statepoint')
+        statepoint['n_realizations'] = n_realizations
+        statepoint['current_batch'] = n_realizations
+        statepoint['n_batches'] = n_realizations
+        statepoint['n_particles'] = 100000
+        tallies = statepoint.create_group('tallies')
+        tallies.attrs['n_tallies'] = 1
+        tallies.attrs['ids'] = np.array([1])
+
+        tally = tallies.create_group('tally 1')
+        tally['name'] = np.bytes_(tally_name)
+        tally['n_realizations'] = n_realizations
+        tally['n_filters'] = 2
+        tally['filters'] = np.array([1, 2])
+        tally['nuclides'] = np.array([b'total'])
+        tally['score_bins'] = np.array([b'flux'])
+        tally['n_score_bins'] = 1
+        tally['results'] = np.stack([sum_, sum_sq], axis=-1)[:, np.newaxis, :]
+
+        filters = tallies.create_group('filters')
+        mesh_filter = filters.create_group('filter 1')
+        mesh_filter['type'] = np.bytes_('mesh')
+        mesh_filter['n_bins'] = n_mesh
+        mesh_filter['bins'] = np.array([1])
+        energy_filter = filters.create_group('filter 2')
+        energy_filter['type'] = np.bytes_('energy')
+        energy_filter['n_bins'] = n_groups
+        energy_filter['bins'] = np.array(energy_edges, dtype=float)
+
+        mesh = tallies.create_group('meshes').create_group('mesh 1')
+        mesh['type'] = np.bytes_('cylindrical')
+        mesh['dimension'] = np.array(mesh_dimension)
+        mesh['r_grid'] = r_grid
+        mesh['phi_grid'] = phi_grid
+        mesh['z_grid'] = z_grid
+        mesh['origin'] = np.zeros(3)
+    return path
+
+def write_synthetic_sweep(target_dir, n_sources, mesh_dimension=CYL_TALLY_DIMENSION, batches=100,
+                          rel_err=0.02, seed=0):
+    """
+    Writes a synthetic individual-source sweep: target_dir/source_XXXX/statepoint.{batches}.h5
+    for sources 1..n_sources, laid out like a real sweep.
+
+    Returns:
+        list: The statepoint paths, in source order.
+    """
+    paths = []
+    for i in range(n_sources):
+        path = os.path.join(target_dir, f'source_{i+1:04d}', f'statepoint.{batches}.h5')
+        paths.append(write_synthetic_statepoint(path, mesh_dimension, n_realizations=batches,
+                                                rel_err=rel_err, source_number=i + 1, seed=seed))
+    return paths
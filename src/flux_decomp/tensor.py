@@ -0,0 +1,234 @@
+import numpy as np
+import h5py
+
+from src.flux_decomp.processing import (
+    _compute_mean_std,
+    _find_tally_group,
+    _read_tally_filters,
+    find_source_statepoints,
+    get_source_number
+)
+
+class FluxTensor:
+    """
+    Lazy, labeled (source x group x score x voxel) view of the flux tally of a set of
+    individual source statepoints (one statepoint per source).
+
+    Axes are built from the tally itself: the energy filter gives the groups (any number,
+    a single group without an energy filter), the tally's score bins give the scores, and
+    the mesh filter gives the voxels in mesh-bin order (z slowest, so a z-plane is a
+    contiguous range). Nothing is read until data is selected, and then only the
+    requested hyperslab of each statepoint's results is read with h5py.
+
+    Parameters:
+    -----------
+    statepoint_paths : list of str
+        One statepoint per source, in source order.
+    tally_name : str
+        Name of the flux tally.
+    source_labels : list
+        Label of each source (defaults to 1..N).
+    group_names : list of str
+        Names of the energy groups (defaults to 'thermal'/'fast' for two groups,
+        'g0', 'g1', ... otherwise).
+    nuclide : str
+        Tally nuclide whose scores are exposed.
+    """
+
+    def __init__(self, statepoint_paths, tally_name='cyl_tally', source_labels=None,
+                 group_names=None, nuclide='total'):
+        if not statepoint_paths:
+            raise ValueError("A FluxTensor needs at least one statepoint.")
+        self.statepoint_paths = list(statepoint_paths)
+        self.tally_name = tally_name
+        if source_labels is None:
+            source_labels = range(1, len(self.statepoint_paths) + 1)
+        self.sources = list(source_labels)
+        if len(self.sources) != len(self.statepoint_paths):
+            raise ValueError("source_labels must have one label per statepoint.")
+
+        # --- Axes from the first statepoint's tally metadata ---
+        with h5py.File(self.statepoint_paths[0], 'r') as statepoint:
+            tally_group = _find_tally_group(statepoint, tally_name)
+            filters = _read_tally_filters(statepoint, tally_group)
+            results_shape = tally_group['results'].shape
+            scores = ([s.decode() for s in tally_group['score_bins'][()]]
+                      if 'score_bins' in tally_group else ['flux'])
+            nuclides = ([n.decode() for n in tally_group['nuclides'][()]]
+                        if 'nuclides' in tally_group else ['total'])
+
+        filter_types = [f['type'] for f in filters]
+        if 'mesh' not in filter_types or not set(filter_types) <= {'mesh', 'energy'}:
+            raise ValueError(f"FluxTensor needs a mesh filter and at most an energy filter, "
+                             f"tally '{tally_name}' has {filter_types}.")
+        if filter_types[0] != 'mesh':
+            raise ValueError("FluxTensor expects the mesh filter before the energy filter.")
+
+        mesh_filter = filters[0]
+        self.mesh_dimension = mesh_filter['dimension']
+        self.n_voxels = int(np.prod(self.mesh_dimension))
+        if 'energy' in filter_types:
+            energy_filter = filters[1]
+            # OpenMC stores the group edges (n_bins + 1 values)
+            edges = np.ravel(energy_filter['bins'])
+            self.energy_bounds = list(zip(edges[:-1], edges[1:]))
+        else:
+            self.energy_bounds = [None]
+        self.n_groups = len(self.energy_bounds)
+        if group_names is None:
+            group_names = ['thermal', 'fast'] if self.n_groups == 2 else [f'g{g}' for g in range(self.n_groups)]
+        self.groups = list(group_names)
+        if len(self.groups) != self.n_groups:
+            raise ValueError(f"Tally has {self.n_groups} energy groups, got {len(self.groups)} group names.")
+
+        self.scores = scores
+        self.n_bins = self.n_voxels * self.n_groups
+        if nuclide not in nuclides:
+            raise ValueError(f"Nuclide '{nuclide}' is not tallied (tally nuclides: {nuclides}).")
+        self._score_offset = nuclides.index(nuclide) * len(scores)
+        if results_shape[0] != self.n_bins or results_shape[1] != len(nuclides) * len(scores):
+            raise ValueError(f"Unexpected results shape {results_shape} for tally '{tally_name}'.")
+
+    @classmethod
+    def from_sweep(cls, target_dir, tally_name='cyl_tally', **kwargs):
+        """
+        Builds the tensor from the final statepoints of the source_XXXX runs in a sweep
+        directory, labeling each source with its 1-based source number. Runs without a
+        statepoint are left out (see find_source_statepoints).
+        """
+        tasks, _ = find_source_statepoints(target_dir)
+        return cls([sp_file for _, sp_file in tasks], tally_name,
+                   source_labels=[get_source_number(run_dir) for run_dir, _ in tasks], **kwargs)
+
+    # --- Axes ---
+
+    @property
+    def shape(self):
+        """(n_sources, n_groups, n_scores, n_voxels)"""
+        return (len(self.sources), self.n_groups, len(self.scores), self.n_voxels)
+
+    @property
+    def voxels_per_z(self):
+        """Number of voxels in one z-plane (nr * nphi)."""
+        return int(self.mesh_dimension[0] * self.mesh_dimension[1])
+
+    def __repr__(self):
+        return (f"FluxTensor(sources={len(self.sources)}, groups={self.groups}, scores={self.scores}, "
+                f"voxels={self.n_voxels} {tuple(self.mesh_dimension)})")
+
+    def _positions(self, labels, axis_labels, axis_name):
+        """
+        Returns the positions of the selected labels on an axis (all when labels is None).
+        Integers are taken as positions only on axes without integer labels (group and
+        score names); on the source axis they are always source labels.
+        """
+        if labels is None:
+            return list(range(len(axis_labels)))
+        if np.isscalar(labels) or isinstance(labels, str):
+            labels = [labels]
+        integer_axis = any(isinstance(a, (int, np.integer)) for a in axis_labels)
+        positions = []
+        for label in labels:
+            if label in axis_labels:
+                positions.append(axis_labels.index(label))
+            elif (not integer_axis and isinstance(label, (int, np.integer))
+                  and 0 <= label < len(axis_labels)):
+                positions.append(int(label))
+            else:
+                raise KeyError(f"'{label}' is not on the {axis_name} axis {axis_labels}.")
+        return positions
+
+    def _voxel_range(self, z=None, voxels=None):
+        """
+        Returns the selected voxels as a (start, stop) range of mesh bins.
+        """
+        if z is not None and voxels is not None:
+            raise ValueError("Select either a z-plane or a voxel range, not both.")
+        if z is not None:
+            if not 0 <= z < self.mesh_dimension[2]:
+                raise IndexError(f"z-plane {z} is outside 0-{self.mesh_dimension[2] - 1}.")
+            return z * self.voxels_per_z, (z + 1) * self.voxels_per_z
+        if voxels is None:
+            return 0, self.n_voxels
+        start, stop, step = voxels.indices(self.n_voxels)
+        if step != 1:
+            raise ValueError("Voxel selections must be contiguous slices.")
+        return start, stop
+
+    # --- Data ---
+
+    def _read_statepoint(self, statepoint_path, voxel_range, group_positions, score_positions, value):
+        """
+        Reads the selected hyperslab of one statepoint: (groups, scores, voxels).
+        """
+        start, stop = voxel_range
+        n_groups = self.n_groups
+        columns = [self._score_offset + s for s in score_positions]
+
+        with h5py.File(statepoint_path, 'r') as statepoint:
+            tally_group = _find_tally_group(statepoint, self.tally_name)
+            results = tally_group['results']
+            if results.shape[0] != self.n_bins:
+                raise ValueError(f"{statepoint_path} has {results.shape[0]} tally bins, expected {self.n_bins}.")
+            n_realizations = int(tally_group['n_realizations'][()])
+
+            if len(group_positions) == 1:
+                # One group: a strided hyperslab (every n_groups-th bin) of the voxel range
+                g = group_positions[0]
+                block = results[start * n_groups + g:stop * n_groups:n_groups, :, :][:, columns, :]
+                block = block[np.newaxis]
+            else:
+                block = results[start * n_groups:stop * n_groups, :, :][:, columns, :]
+                block = block.reshape(stop - start, n_groups, len(columns), 2)[:, group_positions]
+                block = block.transpose(1, 0, 2, 3)
+
+        mean, std_dev = _compute_mean_std(block[..., 0], block[..., 1], n_realizations)
+        data = mean if value == 'mean' else std_dev
+        # (groups, voxels, scores) -> (groups, scores, voxels)
+        return data.transpose(0, 2, 1)
+
+    def sel(self, sources=None, groups=None, scores=None, z=None, voxels=None, value='mean'):
+        """
+        Reads a labeled selection of the tensor.
+
+        Parameters:
+        -----------
+        sources : label or list of labels
+            Source labels (source numbers), all by default.
+        groups : label or list of labels
+            Group names (or positions), all by default.
+        scores : label or list of labels
+            Score names (or positions), all by default.
+        z : int
+            Read a single z-plane.
+        voxels : slice
+            Read a contiguous range of mesh bins.
+        value : str
+            'mean' or 'stdev'.
+
+        Returns:
+        --------
+        np.ndarray
+            Array shaped (sources, groups, scores, voxels).
+        """
+        if value not in ('mean', 'stdev'):
+            raise ValueError(f"value must be 'mean' or 'stdev', not '{value}'.")
+        source_positions = self._positions(sources, self.sources, 'source')
+        group_positions = self._positions(groups, self.groups, 'group')
+        score_positions = self._positions(scores, self.scores, 'score')
+        voxel_range = self._voxel_range(z, voxels)
+
+        out = np.empty((len(source_positions), len(group_positions), len(score_positions),
+                        voxel_range[1] - voxel_range[0]))
+        for i, s in enumerate(source_positions):
+            out[i] = self._read_statepoint(self.statepoint_paths[s], voxel_range,
+                                           group_positions, score_positions, value)
+        return out
+
+    def matrix(self, group, score='flux', value='mean', z=None):
+        """
+        Returns the (N_spatial_voxels x N_sources) matrix of one group and score, the
+        layout of create_individual_source_matrices.
+        """
+        block = self.sel(groups=group, scores=score, z=z, value=value)
+        return np.asfortranarray(block[:, 0, 0, :].T)
@@ -0,0 +1,78 @@
+import openmc
+import numpy as np
+import os
+
+from src.flux_decomp.inputs import get_base_settings, get_flux_mesh_grids
+
+WEIGHT_WINDOWS_FILE = 'weight_windows.h5'
+
+def get_weight_window_mesh():
+    """
+    Returns the mesh the weight windows are generated on: the flux tally's radial rings
+    (out to the absorber wall at r=129.8 cm) with coarser azimuthal sectors and an axial
+    extension around the tallied slab, so windows also cover the streaming paths.
+    """
+    r_grid, _, _ = get_flux_mesh_grids()
+    phi_grid = np.linspace(0, 2*np.pi, 13) # 12 sectors
+    z_grid = np.array([-50, -10, 10, 50])
+
+    return openmc.CylindricalMesh(r_grid, z_grid, phi_grid, np.array([0,0,0]))
+
+def generate_weight_windows(geometry, materials, sources, run_dir, batches=20, particles=100000,
+                            threads=None):
+    """
+    Runs a short pilot of the full source with OpenMC's weight window generator
+    (MAGIC method) and returns the path of the weight_windows.h5 file it writes.
+
+    Parameters:
+    -----------
+    geometry : openmc.Geometry
+        The model geometry.
+    materials : openmc.Materials
+        The model materials.
+    sources : list
+        The full list of source components (all run together in the pilot).
+    run_dir : str
+        Directory for the pilot run; weight_windows.h5 is written here.
+    batches : int
+        Pilot batches. The windows are updated after every batch.
+    particles : int
+        Pilot particles per batch.
+    threads : int
+        OpenMP threads for the pilot run.
+    """
+    settings = get_base_settings(batches=batches, particles=particles)
+    settings.source = sources
+
+    wwg = openmc.WeightWindowGenerator(
+        get_weight_window_mesh(),
+        energy_bounds=[0.0, 0.625, 20.0e6],
+        particle_type='neutron'
+    )
+    wwg.update_interval = 1
+    wwg.max_realizations = batches
+    settings.weight_window_generators = wwg
+
+    os.makedirs(run_dir, exist_ok=True)
+    model = openmc.model.Model(geometry=geometry, materials=materials, settings=settings)
+    model.export_to_xml(directory=run_dir)
+
+    print(f"Generating weight windows in {run_dir}...")
+    openmc.run(cwd=run_dir, threads=threads)
+
+    ww_file = os.path.join(run_dir, WEIGHT_WINDOWS_FILE)
+    if not os.path.isfile(ww_file):
+        raise FileNotFoundError(f"Weight window generation did not write {ww_file}")
+    return ww_file
+
+def apply_weight_windows(settings, weight_windows_file):
+    """
+    Makes a run load its weight windows from a shared file (modifies settings in place).
+    Every run references the same file instead of carrying its own copy in settings.xml.
+    """
+    if not os.path.isfile(weight_windows_file):
+        raise FileNotFoundError(f"Weight window file not found: {weight_windows_file}")
+
+    settings.weight_windows_file = os.path.abspath(weight_windows_file)
+    settings.weight_windows_on = True
+    return settings
@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+# --- Add project root to path ---
+# Prepended: processing.py resolves data directories relative to sys.path[0]
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, project_root)
+# --------------------------------
+
+from src.flux_decomp.synthetic import write_synthetic_sweep
+
+# Small cylindrical mesh (nr, nphi, nz): 60 voxels, 3 z-planes of 20
+MESH_DIMENSION = (4, 5, 3)
+
+@pytest.fixture
+def mesh_dimension():
+    return MESH_DIMENSION
+
+@pytest.fixture
+def sweep_dir(tmp_path):
+    """A synthetic 6-source sweep (source_0001 ... source_0006) with the cyl_tally layout."""
+    target_dir = str(tmp_path / 'sweep')
+    write_synthetic_sweep(target_dir, 6, MESH_DIMENSION, batches=50)
+    return target_dir
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+from src.flux_decomp.decomposition import get_inverse_variance_weights, truncated_svd, weighted_low_rank
+from src.flux_decomp.synthetic import get_synthetic_flux
+
+def _source_matrix(n_sources=40, mesh_dimension=(10, 12, 3), noise=1e-3, seed=0):
+    """(N_spatial_voxels x N_sources) thermal matrix of a synthetic sweep with a little noise."""
+    matrix = np.column_stack([get_synthetic_flux(mesh_dimension, 2, source_number=s, seed=seed)[0]
+                              for s in range(1, n_sources + 1)])
+    rng = np.random.default_rng(seed)
+    return matrix * (1 + noise * rng.standard_normal(matrix.shape))
+
+@pytest.mark.parametrize('method', ['randomized', 'lanczos', 'full'])
+def test_truncated_svd_matches_numpy(method):
+    if method == 'lanczos':
+        pytest.importorskip('scipy')
+    matrix = _source_matrix()
+    u_ref, s_ref, vt_ref = np.linalg.svd(matrix, full_matrices=False)
+
+    u, s, vt, info = truncated_svd(matrix, rank=4, method=method)
+
+    assert u.shape == (matrix.shape[0], 4) and vt.shape == (4, matrix.shape[1])
+    np.testing.assert_allclose(s, s_ref[:4], rtol=1e-8)
+    # Same subspaces, whatever the sign of each mode
+    np.testing.assert_allclose(np.abs(np.sum(u * u_ref[:, :4], axis=0)), 1, atol=1e-6)
+    np.testing.assert_allclose(np.abs(np.sum(vt * vt_ref[:4], axis=1)), 1, atol=1e-6)
+
+    residual = np.linalg.norm(matrix - (u * s) @ vt)
+    assert info['rank'] == 4
+    assert info['truncation_error'] == pytest.approx(residual, rel=1e-4)
+    assert info['relative_error'] == pytest.approx(residual / np.linalg.norm(matrix), rel=1e-4)
+
+@pytest.mark.parametrize('method', ['randomized', 'lanczos', 'full'])
+def test_truncated_svd_energy_target(method):
+    if method == 'lanczos':
+        pytest.importorskip('scipy')
+    matrix = _source_matrix()
+    s_ref = np.linalg.svd(matrix, compute_uv=False)
+    captured = np.cumsum(s_ref**2) / np.sum(s_ref**2)
+    energy = 0.999999
+    expected_rank = int(np.searchsorted(captured, energy)) + 1
+
+    _, s, _, info = truncated_svd(matrix, energy=energy, method=method)
+
+    assert info['rank'] == expected_rank
+    assert info['energy_captured'] >= energy
+    np.testing.assert_allclose(s, s_ref[:expected_rank], rtol=1e-8)
+
+def test_truncated_svd_rejects_bad_targets():
+    matrix = _source_matrix(n_sources=5)
+    with pytest.raises(ValueError):
+        truncated_svd(matrix)
+    with pytest.raises(ValueError):
+        truncated_svd(matrix, rank=6)
+    with pytest.raises(ValueError):
+        truncated_svd(matrix, rank=2, method='qr')
+
+def _noisy_low_rank(n_voxels=600, n_sources=50, rank=3, seed=0):
+    """Low-rank flux-like matrix whose last third of voxels (an outer shield) is 50x noisier."""
+    rng = np.random.default_rng(seed)
+    decay = np.exp(-np.linspace(0, 5, n_voxels))
+    clean = (np.abs(rng.standard_normal((n_voxels, rank))) * decay[:, None]) @ np.abs(rng.standard_normal((rank, n_sources)))
+    rel_err = np.where(np.arange(n_voxels) < 2 * n_voxels // 3, 0.01, 0.5)[:, None]
+    stdev = rel_err * clean * rng.uniform(0.5, 1.5, clean.shape)
+    return clean, clean + stdev * rng.standard_normal(clean.shape), stdev
+
+def test_weighted_low_rank_objective_decreases():
+    clean, noisy, stdev = _noisy_low_rank()
+
+    u, s, vt, info = weighted_low_rank(noisy, stdev, rank=3, tol=1e-8, max_iter=200)
+
+    objective = np.array(info['objective'])
+    assert info['converged']
+    assert np.all(np.diff(objective) <= 1e-10 * objective[:-1])
+    assert objective[-1] < objective[0]
+    # Orthonormal factors
+    np.testing.assert_allclose(u.T @ u, np.eye(3), atol=1e-10)
+    np.testing.assert_allclose(vt @ vt.T, np.eye(3), atol=1e-10)
+    # Noise-limited fit, closer to the clean matrix (in std-devs) than an unweighted SVD
+    assert 0.8 < info['reduced_chi2'] < 1.2
+    u_svd, s_svd, vt_svd, _ = truncated_svd(noisy, rank=3)
+    weighted_err = np.linalg.norm(((u * s) @ vt - clean) / stdev)
+    plain_err = np.linalg.norm(((u_svd * s_svd) @ vt_svd - clean) / stdev)
+    assert weighted_err < plain_err
+
+def test_inverse_variance_weights_handle_zero_stdev():
+    stdev = np.array([[0.0, 0.1], [0.2, 0.0]])
+    mean = np.array([[0.0, 1.0], [2.0, 3.0]])
+    weights = get_inverse_variance_weights(stdev, mean, rel_floor=0.5)
+    # Never scored: no information; zero std-dev with a score: floored, not infinite
+    assert weights[0, 0] == 0
+    assert weights[1, 1] == pytest.approx(1 / (0.5 * 0.15)**2)
+    assert weights[0, 1] == pytest.approx(1 / 0.1**2)
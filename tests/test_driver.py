@@ -0,0 +1,83 @@
+import json
+import os
+import sys
+import types
+
+import openmc
+import pytest
+
+from src.flux_decomp.runner import run_single_source, run_sources_parallel
+
+@pytest.fixture
+def fake_lib(monkeypatch):
+    """
+    Stands in for openmc.lib: records every call with the working directory, and run()
+    writes a statepoint and some library output (to file descriptor 1) like OpenMC does.
+    """
+    lib = types.ModuleType('openmc.lib')
+    lib.calls = []
+    lib.fail_run = False
+
+    def init(args=None, output=True):
+        lib.calls.append(('init', list(args), os.getcwd()))
+
+    def run(output=True):
+        lib.calls.append(('run', os.getcwd()))
+        os.write(1, b'fake transport\n')
+        if lib.fail_run:
+            raise RuntimeError('lost particle')
+        open('statepoint.10.h5', 'wb').close()
+
+    def finalize():
+        lib.calls.append(('finalize', os.getcwd()))
+
+    lib.init, lib.run, lib.finalize = init, run, finalize
+    monkeypatch.setitem(sys.modules, 'openmc.lib', lib)
+    monkeypatch.setattr(openmc, 'lib', lib, raising=False)
+    return lib
+
+def _run_dir(path, source=1):
+    os.makedirs(path)
+    with open(os.path.join(path, 'settings.xml'), 'w') as f:
+        f.write(f'<settings><source strength="{source}"/></settings>')
+    return str(path)
+
+def test_in_process_run_uses_the_run_directory(tmp_path, fake_lib):
+    run_dir = _run_dir(tmp_path / 'source_0001')
+    open(os.path.join(run_dir, 'statepoint.5.h5'), 'wb').close()
+    cwd = os.getcwd()
+
+    run_single_source(run_dir, threads=4, in_process=True)
+
+    assert fake_lib.calls == [('init', ['-s', '4'], run_dir), ('run', run_dir), ('finalize', run_dir)]
+    assert os.getcwd() == cwd
+    # The earlier attempt's statepoint is gone, the library output is in the run's log
+    assert sorted(f for f in os.listdir(run_dir) if f.endswith('.h5')) == ['statepoint.10.h5']
+    with open(os.path.join(run_dir, 'openmc.log')) as f:
+        assert 'fake transport' in f.read()
+
+def test_in_process_run_finalizes_after_a_failure(tmp_path, fake_lib):
+    run_dir = _run_dir(tmp_path / 'source_0001')
+    fake_lib.fail_run = True
+    cwd = os.getcwd()
+
+    with pytest.raises(RuntimeError, match='lost particle'):
+        run_single_source(run_dir, in_process=True)
+
+    assert fake_lib.calls[-1] == ('finalize', run_dir)
+    assert os.getcwd() == cwd
+
+def test_in_process_sweep_is_recorded_and_resumed(tmp_path, fake_lib):
+    run_dirs = [_run_dir(tmp_path / f'source_{i:04d}', i) for i in (1, 2, 3)]
+    manifest_path = str(tmp_path / 'manifest.json')
+
+    results = run_sources_parallel(run_dirs, jobs=2, total_threads=2, resume=True, in_process=True)
+
+    assert results['completed'] == run_dirs and not results['failed']
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    assert {name: entry['statepoint'] for name, entry in manifest.items()} == {
+        'source_0001': 'statepoint.10.h5', 'source_0002': 'statepoint.10.h5', 'source_0003': 'statepoint.10.h5'}
+
+    results = run_sources_parallel(run_dirs, jobs=2, resume=True, in_process=True)
+    assert results['skipped'] == run_dirs and not results['completed']
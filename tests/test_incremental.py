@@ -0,0 +1,39 @@
+import numpy as np
+import os
+
+from src.flux_decomp.incremental import FACTORS_FILE, IncrementalSVD, update_incremental_svd
+from src.flux_decomp.processing import create_individual_source_matrices
+from src.flux_decomp.synthetic import write_synthetic_statepoint
+
+def test_update_incremental_svd_folds_each_run_once(sweep_dir, tmp_path, mesh_dimension):
+    state_dir = str(tmp_path / 'svd')
+    svd, _ = update_incremental_svd(sweep_dir, state_dir, rank=4)
+    assert svd.n_sources == 6
+
+    # Factors, history and folded runs live in one file
+    assert os.listdir(state_dir) == [FACTORS_FILE]
+    again, _ = update_incremental_svd(sweep_dir, state_dir, rank=4)
+    np.testing.assert_array_equal(again.source_indices, svd.source_indices)
+    assert len(again.history) == len(svd.history)
+
+    write_synthetic_statepoint(os.path.join(sweep_dir, 'source_0007', 'statepoint.50.h5'), mesh_dimension,
+                               n_realizations=50, source_number=7)
+    grown, _ = update_incremental_svd(sweep_dir, state_dir, rank=4)
+    np.testing.assert_array_equal(grown.source_indices, np.arange(1, 8))
+
+    matrix = create_individual_source_matrices(sweep_dir)['thermal_mean']
+    np.testing.assert_allclose(grown.s, np.linalg.svd(matrix, compute_uv=False)[:4], rtol=1e-8)
+    reconstruction = (grown.U * grown.s) @ grown.Vt
+    assert np.linalg.norm(matrix - reconstruction) / np.linalg.norm(matrix) <= grown.relative_error() + 1e-8
+
+def test_incremental_svd_save_load_round_trip(tmp_path):
+    rng = np.random.default_rng(0)
+    svd = IncrementalSVD('fast_mean', rank=3)
+    svd.update([1, 2], {'fast_mean': rng.standard_normal((50, 2))})
+    svd.update([3], {'fast_mean': rng.standard_normal((50, 1))})
+    svd.save(str(tmp_path), folded_runs={'source_0001': ['statepoint.50.h5', 10, 20]})
+
+    loaded, folded_runs = IncrementalSVD.load(str(tmp_path))
+    assert folded_runs == {'source_0001': ['statepoint.50.h5', 10, 20]}
+    assert loaded.key == 'fast_mean' and loaded.n_updates == 2 and loaded.history == svd.history
+    np.testing.assert_array_equal(loaded.Vt, svd.Vt)
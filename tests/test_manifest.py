@@ -0,0 +1,30 @@
+import pytest
+
+from src.flux_decomp.manifest import compute_input_hash
+
+def _write_run(run_dir, weight_windows_file):
+    run_dir.mkdir(exist_ok=True)
+    (run_dir / 'settings.xml').write_text(
+        "<?xml version='1.0' encoding='utf-8'?>\n<settings>\n"
+        "  <particles>1000</particles>\n"
+        f"  <weight_windows_file>{weight_windows_file}</weight_windows_file>\n"
+        "</settings>\n")
+    return str(run_dir)
+
+def test_input_hash_covers_the_weight_window_file(tmp_path):
+    weight_windows = tmp_path / 'weight_windows.h5'
+    weight_windows.write_bytes(b'windows v1')
+    run_dirs = [_write_run(tmp_path / f'source_{i:04d}', weight_windows) for i in (1, 2)]
+
+    file_cache = {}
+    before = [compute_input_hash(d, file_cache=file_cache) for d in run_dirs]
+    assert str(weight_windows) in file_cache
+
+    # Regenerated weight windows change the hash of every run that references them
+    weight_windows.write_bytes(b'windows v2')
+    after = [compute_input_hash(d) for d in run_dirs]
+    assert before[0] != after[0] and before[1] != after[1]
+
+    weight_windows.unlink()
+    with pytest.raises(FileNotFoundError):
+        compute_input_hash(run_dirs[0])
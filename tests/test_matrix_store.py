@@ -0,0 +1,81 @@
+import numpy as np
+import os
+import pytest
+
+from src.flux_decomp import matrix_store
+from src.flux_decomp.matrix_store import load_matrix_store, update_matrix_store
+from src.flux_decomp.synthetic import get_synthetic_flux, write_synthetic_statepoint
+
+def _rerun(sweep_dir, mesh_dimension, run_name, source_number):
+    """Rewrites a run's statepoint with another flux, as a re-run would (new mtime)."""
+    path = os.path.join(sweep_dir, run_name, 'statepoint.50.h5')
+    old_mtime = os.stat(path).st_mtime_ns if os.path.exists(path) else 0
+    write_synthetic_statepoint(path, mesh_dimension, n_realizations=50, source_number=source_number)
+    # Guarantee a new stamp even on filesystems with coarse timestamps
+    os.utime(path, ns=(old_mtime + 10**9, old_mtime + 10**9))
+    return path
+
+def test_update_matrix_store_rereads_only_changed_statepoints(sweep_dir, tmp_path, mesh_dimension):
+    store_dir = str(tmp_path / 'store')
+    first = update_matrix_store(sweep_dir, store_dir)
+    assert first['updated'] == [1, 2, 3, 4, 5, 6]
+
+    unchanged = update_matrix_store(sweep_dir, store_dir)
+    assert unchanged['updated'] == []
+
+    # A re-run of source 2 invalidates only its stamp; its column is overwritten in place
+    _rerun(sweep_dir, mesh_dimension, 'source_0002', source_number=42)
+    changed = update_matrix_store(sweep_dir, store_dir)
+    assert changed['updated'] == [2]
+    np.testing.assert_allclose(changed['thermal_mean'][:, 1],
+                               get_synthetic_flux(mesh_dimension, 2, source_number=42)[0], rtol=1e-12)
+    np.testing.assert_allclose(changed['thermal_mean'][:, 0],
+                               get_synthetic_flux(mesh_dimension, 2, source_number=1)[0], rtol=1e-12)
+
+def test_update_matrix_store_adds_new_sources(sweep_dir, tmp_path, mesh_dimension):
+    store_dir = str(tmp_path / 'store')
+    update_matrix_store(sweep_dir, store_dir)
+
+    _rerun(sweep_dir, mesh_dimension, 'source_0007', source_number=7)
+    added = update_matrix_store(sweep_dir, store_dir)
+    assert added['updated'] == [7]
+
+    store = load_matrix_store(store_dir)
+    np.testing.assert_array_equal(store['source_indices'], [1, 2, 3, 4, 5, 6, 7])
+    for position, source in enumerate(store['source_indices']):
+        np.testing.assert_allclose(store['fast_mean'][:, position],
+                                   get_synthetic_flux(mesh_dimension, 2, source_number=source)[1], rtol=1e-12)
+
+def test_update_matrix_store_keeps_store_when_nothing_is_readable(sweep_dir, tmp_path, mesh_dimension):
+    store_dir = str(tmp_path / 'store')
+    update_matrix_store(sweep_dir, store_dir)
+
+    for source in range(1, 7):
+        with open(os.path.join(sweep_dir, f'source_{source:04d}', 'statepoint.50.h5'), 'wb') as f:
+            f.write(b'not a statepoint')
+    kept = update_matrix_store(sweep_dir, store_dir)
+    assert kept['updated'] == []
+    assert len(kept['errors']) == 6
+    np.testing.assert_array_equal(kept['source_indices'], [1, 2, 3, 4, 5, 6])
+    np.testing.assert_allclose(load_matrix_store(store_dir)['thermal_mean'][:, 2],
+                               get_synthetic_flux(mesh_dimension, 2, source_number=3)[0], rtol=1e-12)
+
+def test_interrupted_rebuild_leaves_previous_generation(sweep_dir, tmp_path, mesh_dimension, monkeypatch):
+    store_dir = str(tmp_path / 'store')
+    update_matrix_store(sweep_dir, store_dir)
+
+    def crash(*args, **kwargs):
+        raise RuntimeError('interrupted')
+
+    _rerun(sweep_dir, mesh_dimension, 'source_0007', source_number=7)
+    monkeypatch.setattr(matrix_store, 'save_manifest', crash)
+    with pytest.raises(RuntimeError):
+        update_matrix_store(sweep_dir, store_dir)
+    store = load_matrix_store(store_dir)
+    np.testing.assert_array_equal(store['source_indices'], [1, 2, 3, 4, 5, 6])
+    assert store['fast_mean'].shape[1] == 6
+
+    monkeypatch.undo()
+    resumed = update_matrix_store(sweep_dir, store_dir)
+    assert resumed['updated'] == [7]
+    assert sorted(n for n in os.listdir(store_dir) if n.startswith('generation_')) == ['generation_0002']
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from src.flux_decomp.precision import bit_round, compare_precision, get_keep_bits, reduce_precision
+
+def _flux_like_values(n=20000, seed=0):
+    """Positive values over many decades (like a flux map from core to shield), plus zeros."""
+    rng = np.random.default_rng(seed)
+    values = 10.0**rng.uniform(-12, 2, n) * rng.uniform(1, 2, n)
+    values[::97] = 0.0
+    return values
+
+@pytest.mark.parametrize('max_rel_err', [1e-1, 1e-3, 1e-5, 1e-7, 1e-10])
+def test_bitround_respects_error_bound(max_rel_err):
+    values = _flux_like_values()
+    reduced = reduce_precision(values, 'bitround', max_rel_err)
+
+    nonzero = values != 0
+    rel_err = np.abs(reduced.astype(np.float64)[nonzero] - values[nonzero]) / values[nonzero]
+    assert rel_err.max() <= max_rel_err
+    assert np.all(reduced[~nonzero] == 0)
+
+    stats = compare_precision(values, reduced)
+    assert stats['max_rel_err'] == pytest.approx(rel_err.max())
+    # Up to 23 kept bits the rounded values are exact in float32
+    expected_dtype = np.float32 if get_keep_bits(max_rel_err) <= 23 else np.float64
+    assert reduced.dtype == expected_dtype
+
+def test_bit_round_zeroes_dropped_bits():
+    keep_bits = 10
+    rounded = bit_round(_flux_like_values(), keep_bits)
+    dropped_mask = np.uint64((1 << (52 - keep_bits)) - 1)
+    assert np.all(rounded.view(np.uint64) & dropped_mask == 0)
+
+def test_float32_error_bound():
+    values = _flux_like_values()
+    reduced = reduce_precision(values, 'float32')
+    nonzero = values != 0
+    rel_err = np.abs(reduced.astype(np.float64)[nonzero] - values[nonzero]) / values[nonzero]
+    assert rel_err.max() <= 2.0**-24
+
+@pytest.mark.parametrize('mode,max_rel_err', [('float32', None), ('bitround', 1e-3)])
+@pytest.mark.parametrize('value', [1e39, 1e-39, -1e-45])
+def test_float32_storage_rejects_out_of_range_values(mode, max_rel_err, value):
+    values = np.array([0.0, 1.0, value])
+    with pytest.raises(ValueError):
+        reduce_precision(values, mode, max_rel_err)
+    # float64 storage keeps them
+    np.testing.assert_array_equal(reduce_precision(values, 'float64'), values)
+
+def test_bitround_rounding_past_float32_max_is_rejected():
+    # The largest float32 is exact in float32, but rounds up to 2**128 with fewer mantissa bits
+    largest = np.array([float(np.finfo(np.float32).max)])
+    assert reduce_precision(largest, 'float32')[0] == largest[0]
+    with pytest.raises(ValueError):
+        reduce_precision(largest, 'bitround', 1e-3)
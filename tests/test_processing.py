@@ -0,0 +1,61 @@
+import h5py
+import numpy as np
+import os
+import pytest
+
+from src.flux_decomp.processing import create_individual_source_matrices, load_tally_mean_std, read_tally_results
+from src.flux_decomp.synthetic import get_synthetic_flux, write_synthetic_statepoint
+
+def _openmc_tally_mean_std(statepoint_path):
+    """Mean and std-dev of the mean the way openmc.Tally computes them from sum/sum_sq."""
+    with h5py.File(statepoint_path, 'r') as f:
+        tally = f['tallies/tally 1']
+        n = int(tally['n_realizations'][()])
+        results = tally['results'][()]
+    sum_, sum_sq = results[..., 0].ravel(), results[..., 1].ravel()
+    mean = sum_ / n
+    std_dev = np.sqrt((sum_sq / n - mean**2) / (n - 1))
+    return mean, std_dev
+
+def test_read_tally_results_matches_openmc_formula(tmp_path, mesh_dimension):
+    path = write_synthetic_statepoint(str(tmp_path / 'statepoint.50.h5'), mesh_dimension,
+                                      n_realizations=50, rel_err=0.03)
+    mean, std_dev, filters = read_tally_results(path, 'cyl_tally')
+    expected_mean, expected_std = _openmc_tally_mean_std(path)
+
+    np.testing.assert_allclose(mean, expected_mean, rtol=1e-12)
+    np.testing.assert_allclose(std_dev, expected_std, rtol=1e-8)
+    # The writer encodes a 3% relative std-dev in every bin
+    np.testing.assert_allclose(std_dev / mean, 0.03, rtol=1e-6)
+    assert [f['type'] for f in filters] == ['mesh', 'energy']
+    assert filters[0]['dimension'] == mesh_dimension
+
+def test_load_tally_mean_std_column_order(tmp_path, mesh_dimension):
+    path = write_synthetic_statepoint(str(tmp_path / 'statepoint.50.h5'), mesh_dimension,
+                                      n_realizations=50, source_number=3)
+    mean, std_dev = load_tally_mean_std(path, 'cyl_tally')
+
+    nr, nphi, nz = mesh_dimension
+    assert mean.shape == (2, nz, nphi, nr)
+    # [e].flatten(order='F') is mesh-bin order (r fastest), the source matrix column order
+    expected = get_synthetic_flux(mesh_dimension, 2, source_number=3)
+    for e in range(2):
+        np.testing.assert_allclose(mean[e].flatten(order='F'), expected[e], rtol=1e-12)
+
+@pytest.mark.parametrize('workers, use_out_dir', [(1, False), (3, False), (3, True)])
+def test_create_individual_source_matrices_column_order(sweep_dir, tmp_path, mesh_dimension, workers, use_out_dir):
+    # An unreadable run is dropped and the remaining columns stay in source order
+    with open(os.path.join(sweep_dir, 'source_0004', 'statepoint.50.h5'), 'wb') as f:
+        f.write(b'not an HDF5 file')
+    out_dir = str(tmp_path / 'npy') if use_out_dir else None
+
+    matrices = create_individual_source_matrices(sweep_dir, workers=workers, out_dir=out_dir)
+
+    np.testing.assert_array_equal(matrices['source_indices'], [1, 2, 3, 5, 6])
+    assert list(matrices['errors']) == ['source_0004']
+    assert matrices['thermal_mean'].shape == (int(np.prod(mesh_dimension)), 5)
+    for position, source in enumerate(matrices['source_indices']):
+        expected = get_synthetic_flux(mesh_dimension, 2, source_number=source)
+        np.testing.assert_allclose(matrices['thermal_mean'][:, position], expected[0], rtol=1e-12)
+        np.testing.assert_allclose(matrices['fast_mean'][:, position], expected[1], rtol=1e-12)
+        np.testing.assert_allclose(matrices['fast_stdev'][:, position], 0.02 * expected[1], rtol=1e-6)
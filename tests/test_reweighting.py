@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from src.flux_decomp.processing import create_individual_source_matrices, load_tally_mean_std
+from src.flux_decomp.reweighting import compare_with_full_run, get_strength_weights, reweight_source_flux
+from src.flux_decomp.surrogate import FluxSurrogate
+from src.flux_decomp.synthetic import write_synthetic_full_source_statepoint
+
+def _full_source_run(tmp_path, mesh_dimension, strengths=None):
+    path = write_synthetic_full_source_statepoint(str(tmp_path / 'full' / 'statepoint.50.h5'), 6, strengths,
+                                                  mesh_dimension, n_realizations=50)
+    mean, stdev = load_tally_mean_std(path, 'cyl_tally')
+    return [(mean[e].flatten(order='F'), stdev[e].flatten(order='F')) for e in range(2)]
+
+@pytest.mark.parametrize('strengths', [None, [1.0, 2.0, 4.0, 8.0, 4.0, 2.0]])
+def test_reweighting_reproduces_full_source_run(sweep_dir, tmp_path, mesh_dimension, strengths):
+    matrices = create_individual_source_matrices(base_dir=sweep_dir, tally_name='cyl_tally')
+    full_run = _full_source_run(tmp_path, mesh_dimension, strengths)
+    profile = np.ones(6) if strengths is None else np.array(strengths)
+
+    for group, (full_mean, full_stdev) in zip(('thermal', 'fast'), full_run):
+        flux, stdev = reweight_source_flux(matrices[f'{group}_mean'], matrices[f'{group}_stdev'],
+                                           profile, matrices['source_indices'])
+        result = compare_with_full_run(flux, stdev, full_mean, full_stdev, print_report=False)
+        assert result['n_voxels'] == flux.size
+        assert result['frac_within_2sigma'] >= 0.9
+        assert 0.5 < result['reduced_chi2'] < 1.5
+        assert abs(result['total_rel_diff']) < 0.01
+
+def test_column_sum_is_not_the_full_source_flux(sweep_dir, tmp_path, mesh_dimension):
+    # Tallies are per source particle: the flat full-source run is M @ ones / N, not M @ ones
+    matrices = create_individual_source_matrices(base_dir=sweep_dir, tally_name='cyl_tally')
+    (full_mean, full_stdev), _ = _full_source_run(tmp_path, mesh_dimension)
+    summed = matrices['thermal_mean'] @ np.ones(6)
+
+    result = compare_with_full_run(summed, np.zeros_like(summed), full_mean, full_stdev, print_report=False)
+    assert result['total_rel_diff'] == pytest.approx(5.0, rel=0.01)
+    assert result['frac_within_2sigma'] < 0.05
+
+def test_strength_weights_of_missing_sources():
+    weights, missing = get_strength_weights([1.0, 1.0, 2.0, 4.0], source_indices=[1, 3, 4])
+    np.testing.assert_allclose(weights, [0.125, 0.25, 0.5])
+    assert missing == pytest.approx(0.125)
+    with pytest.raises(ValueError):
+        get_strength_weights([0.0, 0.0])
+
+def test_surrogate_normalizes_strengths_like_reweighting(sweep_dir, mesh_dimension):
+    matrices = create_individual_source_matrices(base_dir=sweep_dir, tally_name='cyl_tally')
+    surrogate = FluxSurrogate.from_matrices(matrices, np.ones(mesh_dimension), rank=6, method='full')
+
+    strengths = np.vstack([np.ones(6), [1.0, 2.0, 4.0, 8.0, 4.0, 2.0], np.eye(6)[2]])
+    for group in ('thermal', 'fast'):
+        flux, _ = reweight_source_flux(matrices[f'{group}_mean'], matrices[f'{group}_stdev'], strengths)
+        np.testing.assert_allclose(surrogate.evaluate(strengths, group=group), flux, rtol=1e-10, atol=1e-12)
+    # A unit vector is the source's own column
+    np.testing.assert_allclose(surrogate.evaluate(np.eye(6)[2]), matrices['thermal_mean'][:, 2], rtol=1e-10)
@@ -0,0 +1,43 @@
+import numpy as np
+import os
+import pytest
+import shutil
+
+from src.flux_decomp.processing import create_individual_source_matrices
+from src.flux_decomp.synthetic import CYL_TALLY_ENERGY_EDGES, get_synthetic_flux
+from src.flux_decomp.tensor import FluxTensor
+
+def test_flux_tensor_from_two_group_statepoints(sweep_dir, mesh_dimension):
+    # The energy filter stores the 3 edges of cyl_tally's 2 groups
+    tensor = FluxTensor.from_sweep(sweep_dir)
+
+    n_voxels = int(np.prod(mesh_dimension))
+    assert tensor.shape == (6, 2, 1, n_voxels)
+    assert tensor.groups == ['thermal', 'fast']
+    assert tensor.energy_bounds == [(CYL_TALLY_ENERGY_EDGES[0], CYL_TALLY_ENERGY_EDGES[1]),
+                                    (CYL_TALLY_ENERGY_EDGES[1], CYL_TALLY_ENERGY_EDGES[2])]
+
+    expected = get_synthetic_flux(mesh_dimension, 2, source_number=4)
+    np.testing.assert_allclose(tensor.sel(sources=4, groups='fast')[0, 0, 0], expected[1], rtol=1e-12)
+
+def test_flux_tensor_matches_source_matrices(sweep_dir, mesh_dimension):
+    tensor = FluxTensor.from_sweep(sweep_dir)
+    matrices = create_individual_source_matrices(sweep_dir)
+
+    np.testing.assert_allclose(tensor.matrix('thermal'), matrices['thermal_mean'], rtol=1e-12)
+    np.testing.assert_allclose(tensor.matrix('fast', value='stdev'), matrices['fast_stdev'], rtol=1e-12)
+
+    # A z-plane is a contiguous block of nr * nphi voxels
+    plane = slice(tensor.voxels_per_z, 2 * tensor.voxels_per_z)
+    np.testing.assert_allclose(tensor.matrix('fast', z=1), matrices['fast_mean'][plane], rtol=1e-12)
+
+def test_flux_tensor_source_integers_are_labels(sweep_dir, mesh_dimension):
+    shutil.rmtree(os.path.join(sweep_dir, 'source_0001'))
+    tensor = FluxTensor.from_sweep(sweep_dir)
+    assert tensor.sources == [2, 3, 4, 5, 6]
+
+    # Source 1 has no run, and is not read as the position of source 2
+    with pytest.raises(KeyError):
+        tensor.sel(sources=1)
+    expected = get_synthetic_flux(mesh_dimension, 2, source_number=5)
+    np.testing.assert_allclose(tensor.sel(sources=5, groups=1)[0, 0, 0], expected[1], rtol=1e-12)